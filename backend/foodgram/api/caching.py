@@ -0,0 +1,285 @@
+import gzip
+from hashlib import md5
+from time import sleep, time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag, urlencode
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+RECIPE_LIST_GENERATION = "recipe_list"
+RECIPE_SHARED_GENERATION = "recipe_shared"
+TAGS_GENERATION = "tags"
+INGREDIENTS_GENERATION = "ingredients"
+
+
+def recipe_generation(pk):
+    return f"recipe:{pk}"
+
+
+def get_generation(name):
+    return cache.get_or_set(
+        f"generation:{name}", uuid4().hex, settings.CACHE_GENERATION_TTL
+    )
+
+
+def bump_generation(*names):
+    """Меняет поколения после фиксации текущей транзакции.
+
+    Поколение — случайный токен, поэтому его можно отдавать как ETag:
+    разные процессы не выдадут одно значение для разных данных.
+    """
+
+    def bump():
+        cache.set_many(
+            {f"generation:{name}": uuid4().hex for name in names},
+            settings.CACHE_GENERATION_TTL,
+        )
+
+    transaction.on_commit(bump)
+
+
+def normalize_query_params(query_params):
+    return urlencode(
+        sorted(
+            (key, value)
+            for key in query_params
+            for value in query_params.getlist(key)
+        )
+    )
+
+
+class ResponseCacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / total if total else 0.0,
+        }
+
+
+response_cache = ResponseCacheStats()
+
+
+class ResponseCacheMixin:
+    """Кэш ответов list/retrieve с защитой от одновременного пересчёта.
+
+    Ключ строится из нормализованных параметров запроса и счётчиков
+    поколений из get_response_generations(). Устаревшее значение
+    пересчитывает только запрос, взявший блокировку в кэше; остальные
+    ещё RESPONSE_CACHE_GRACE секунд получают прежний ответ.
+
+    Блокировка — cache.add(), поэтому между процессами она работает только
+    на бэкенде с атомарным add(): DatabaseCache, Redis, Memcached. У
+    FileBasedCache add() — проверка и запись без блокировки.
+    """
+
+    response_cache_generations = ()
+
+    def should_cache_response(self, request):
+        return True
+
+    def get_response_generations(self):
+        return [get_generation(name) for name in self.response_cache_generations]
+
+    def get_response_cache_key(self, request):
+        signature = md5(
+            normalize_query_params(request.query_params).encode()
+        ).hexdigest()
+        generation = ".".join(map(str, self.get_response_generations()))
+        return (
+            f"response:{self.basename}:{self.action}:"
+            f"{self.kwargs.get(self.lookup_field, '')}:{generation}:{signature}"
+        )
+
+    def wait_for_response(self, key):
+        deadline = time() + settings.RESPONSE_CACHE_LOCK_TIMEOUT
+        while time() < deadline:
+            sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def cached_response(self, view, request, *args, **kwargs):
+        if not self.should_cache_response(request):
+            return view(request, *args, **kwargs)
+        key = self.get_response_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None and entry[1] > time():
+            response_cache.hits += 1
+            return Response(entry[0])
+        lock_key = f"lock:{key}"
+        if cache.add(lock_key, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+            response_cache.misses += 1
+            try:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(
+                        key,
+                        (response.data, time() + settings.RESPONSE_CACHE_TTL),
+                        settings.RESPONSE_CACHE_TTL + settings.RESPONSE_CACHE_GRACE,
+                    )
+                return response
+            finally:
+                cache.delete(lock_key)
+        if entry is not None:
+            response_cache.stale_hits += 1
+            return Response(entry[0])
+        entry = self.wait_for_response(key)
+        if entry is None:
+            response_cache.misses += 1
+            return view(request, *args, **kwargs)
+        response_cache.hits += 1
+        return Response(entry[0])
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+
+class AnonymousResponseCacheMixin(ResponseCacheMixin):
+    """Кэш рецептов для анонимных пользователей.
+
+    Список зависит от RECIPE_LIST_GENERATION, рецепт — от своего поколения,
+    оба — от RECIPE_SHARED_GENERATION (теги, пользователи и ингредиенты).
+    """
+
+    def should_cache_response(self, request):
+        return request.user.is_anonymous
+
+    def get_response_generations(self):
+        generations = [get_generation(RECIPE_SHARED_GENERATION)]
+        if self.action == "list":
+            generations.append(get_generation(RECIPE_LIST_GENERATION))
+        else:
+            generations.append(
+                get_generation(recipe_generation(self.kwargs[self.lookup_field]))
+            )
+        return generations
+
+
+class ConditionalGetMixin:
+    """ETag и Last-Modified для list/retrieve.
+
+    Валидаторы берутся из get_validators() до сериализации, поэтому на
+    совпавший If-None-Match/If-Modified-Since отдаётся 304 без запросов
+    к связанным таблицам. По умолчанию ETag строится из поколений
+    response_cache_generations и параметров запроса.
+    """
+
+    response_cache_generations = ()
+
+    def get_validators(self, request):
+        if not self.response_cache_generations:
+            return None, None
+        generations = ".".join(
+            get_generation(name) for name in self.response_cache_generations
+        )
+        return (
+            f"{self.action}:{self.kwargs.get(self.lookup_field, '')}:{generations}:"
+            f"{normalize_query_params(request.query_params)}",
+            None,
+        )
+
+    def conditional_response(self, view, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if etag is not None:
+            etag = quote_etag(md5(etag.encode()).hexdigest())
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            return response
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            if etag is not None:
+                response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+def accepts_gzip(accept_encoding):
+    """Разрешает ли Accept-Encoding gzip с учётом q-значений (RFC 7231)."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights.get("gzip", weights.get("*", 0.0)) > 0
+
+
+class Snapshot:
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=6)
+
+
+class SnapshotListMixin:
+    """Полный список без параметров отдаётся готовыми байтами.
+
+    Каждый процесс хранит отрендеренный JSON и его gzip-вариант и
+    пересобирает их только при смене поколений response_cache_generations.
+    """
+
+    response_cache_generations = ()
+    snapshots = {}
+
+    def get_snapshot(self):
+        version = tuple(
+            get_generation(name) for name in self.response_cache_generations
+        )
+        snapshot = self.snapshots.get(self.basename)
+        if snapshot is None or snapshot.version != version:
+            queryset = self.filter_queryset(self.get_queryset())
+            data = self.get_serializer(queryset, many=True).data
+            snapshot = Snapshot(version, JSONRenderer().render(data))
+            self.snapshots[self.basename] = snapshot
+        return snapshot
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        snapshot = self.get_snapshot()
+        accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if accepts_gzip(accept_encoding):
+            response = HttpResponse(snapshot.gzip_body, content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(snapshot.body, content_type="application/json")
+        response["Vary"] = "Accept-Encoding"
+        return response
@@ -0,0 +1,90 @@
+import base64
+import binascii
+import re
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from drf_extra_fields.fields import Base64FieldMixin, Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+IMAGE_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+WHITESPACE = re.compile(r"\s+")
+
+
+class LimitedBase64ImageField(Base64ImageField):
+    """Картинка в base64 или файлом multipart с ограничением размера.
+
+    base64 декодируется кусками во временный файл, а размер в пикселях
+    проверяется по заголовку до полного декодирования картинки.
+    """
+
+    CHUNK_SIZE = 256 * 1024
+
+    def to_internal_value(self, data):
+        if data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(data, str):
+            if not isinstance(data, UploadedFile):
+                raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+            self.check_image(data)
+            return super(Base64FieldMixin, self).to_internal_value(data)
+        # Временный файл из base64 создан здесь, и закрыть его при ошибке
+        # больше некому: иначе он так и останется на диске.
+        data = self.decode_to_file(data)
+        try:
+            self.check_image(data)
+            return super(Base64FieldMixin, self).to_internal_value(data)
+        except serializers.ValidationError:
+            data.close()
+            raise
+
+    def check_size(self, size):
+        if size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(
+                "Размер картинки не должен превышать "
+                f"{settings.IMAGE_MAX_UPLOAD_SIZE} байт."
+            )
+
+    def decode_to_file(self, data):
+        if ";base64," in data:
+            data = data.split(";base64,", 1)[1]
+        self.check_size(len(data) * 3 // 4)
+        file = TemporaryUploadedFile(
+            name=f"{uuid.uuid4()}.tmp", content_type=None, size=0, charset=None
+        )
+        pending = ""
+        try:
+            for start in range(0, len(data), self.CHUNK_SIZE):
+                pending += WHITESPACE.sub("", data[start : start + self.CHUNK_SIZE])
+                cut = len(pending) - len(pending) % 4
+                file.write(base64.b64decode(pending[:cut]))
+                pending = pending[cut:]
+            if pending:
+                raise binascii.Error("Incorrect padding")
+        except (binascii.Error, ValueError):
+            file.close()
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def check_image(self, file):
+        self.check_size(file.size)
+        try:
+            with Image.open(file) as image:
+                width, height = image.size
+                image_format = image.format
+        except (OSError, Image.DecompressionBombError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        if image_format not in IMAGE_EXTENSIONS:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                "Картинка не должна быть больше "
+                f"{settings.IMAGE_MAX_PIXELS} пикселей."
+            )
+        if isinstance(file, TemporaryUploadedFile) and file.name.endswith(".tmp"):
+            file.name = f"{file.name[:-4]}.{IMAGE_EXTENSIONS[image_format]}"
+        file.seek(0)
@@ -1,21 +1,41 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Exists, F, OuterRef, Q
 from django_filters import rest_framework as filters
 
-from recipes.models import Recipe, Ingredient, User
+from api.utils import get_tag_registry
+from recipes.models import SEARCH_CONFIG, Recipe, Ingredient, User
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_registry()]
 
 
 class IngredientSearchFilter(filters.FilterSet):
     name = filters.CharFilter(field_name="name", lookup_expr="istartswith")
+    contains = filters.CharFilter(field_name="name", lookup_expr="icontains")
 
     class Meta:
         model = Ingredient
-        fields = ("name",)
+        fields = ("name", "contains")
 
 
 class AuthorAndTagFilter(filters.FilterSet):
-    tags = filters.AllValuesMultipleFilter(field_name="tags__slug")
+    tags = filters.MultipleChoiceFilter(choices=tag_choices, method="filter_tags")
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = filters.BooleanFilter(method="filter_is_favorited")
     is_in_shopping_cart = filters.BooleanFilter(method="filter_is_in_shopping_cart")
+    search = filters.CharFilter(method="filter_search")
+
+    def filter_tags(self, queryset, name, value):
+        registry = get_tag_registry()
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe=OuterRef("pk"), tag__in=[registry[slug] for slug in value]
+                )
+            )
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
@@ -27,6 +47,16 @@ class AuthorAndTagFilter(filters.FilterSet):
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        if connection.vendor != "postgresql":
+            return queryset.filter(Q(name__icontains=value) | Q(text__icontains=value))
+        query = SearchQuery(value, config=SEARCH_CONFIG, search_type="websearch")
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-pub_date")
+        )
+
     class Meta:
         model = Recipe
         fields = ("tags", "author")
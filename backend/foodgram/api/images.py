@@ -0,0 +1,203 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image
+
+from api.caching import RECIPE_LIST_GENERATION, bump_generation, recipe_generation
+from api.utils import insert_ignore
+from recipes.models import Recipe, StoredImage
+
+RENDITIONS = {
+    "card": (600, 600),
+    "detail": (1200, 1200),
+    "small": (240, 240),
+}
+FORMATS = {
+    "jpeg": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("webp", {"quality": 80, "method": 4}),
+}
+
+executor = ThreadPoolExecutor(max_workers=settings.IMAGE_RENDITION_WORKERS)
+
+
+def rendition_name(source, rendition, extension):
+    directory, filename = os.path.split(source)
+    stem = os.path.splitext(filename)[0]
+    return f"{directory}/renditions/{stem}_{rendition}.{extension}"
+
+
+def rendition_names(source):
+    return {
+        rendition: {
+            image_format: rendition_name(source, rendition, extension)
+            for image_format, (extension, _) in FORMATS.items()
+        }
+        for rendition in RENDITIONS
+    }
+
+
+def replace_file(storage, name, content):
+    """Записывает файл так, чтобы читатели не видели его отсутствия."""
+    if not storage.exists(name):
+        return storage.save(name, content)
+    try:
+        target = storage.path(name)
+    except NotImplementedError:
+        storage.delete(name)
+        return storage.save(name, content)
+    temporary = storage.save(f"{name}.tmp", content)
+    os.replace(storage.path(temporary), target)
+    return name
+
+
+def build_renditions(image_field, force=False):
+    """Сохраняет уменьшенные JPEG и WebP копии картинки рецепта.
+
+    Имена копий выводятся из имени исходника, а оно — из хэша содержимого,
+    поэтому у рецептов с одной картинкой копии общие: готовые копии
+    переиспользуются и пересоздаются только с force.
+    """
+    storage = default_storage
+    names = rendition_names(image_field.name)
+    renditions = {"source": image_field.name, **names}
+    missing = [
+        (rendition, image_format, name)
+        for rendition, formats in names.items()
+        for image_format, name in formats.items()
+        if force or not storage.exists(name)
+    ]
+    if not missing:
+        return renditions
+    with image_field.open("rb") as source, Image.open(source) as image:
+        image = image.convert("RGB")
+        copies = {}
+        for rendition, image_format, name in missing:
+            if rendition not in copies:
+                copies[rendition] = image.copy()
+                copies[rendition].thumbnail(RENDITIONS[rendition])
+            buffer = io.BytesIO()
+            _, options = FORMATS[image_format]
+            copies[rendition].save(buffer, format=image_format.upper(), **options)
+            renditions[rendition][image_format] = replace_file(
+                storage, name, ContentFile(buffer.getvalue())
+            )
+    return renditions
+
+
+def generate_renditions(recipe_id, force=False):
+    recipe = Recipe.objects.only("id", "image").filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return False
+    renditions = build_renditions(recipe.image, force)
+    updated = Recipe.objects.filter(pk=recipe_id, image=recipe.image.name).update(
+        image_renditions=renditions, updated=timezone.now()
+    )
+    if updated:
+        bump_generation(RECIPE_LIST_GENERATION, recipe_generation(recipe_id))
+    return bool(updated)
+
+
+def run_in_background(recipe_id):
+    try:
+        generate_renditions(recipe_id)
+    finally:
+        close_old_connections()
+
+
+def is_fresh(storage, name):
+    """Файл изменён недавно: его могла только что получить новая загрузка."""
+    try:
+        modified = storage.get_modified_time(name)
+    except FileNotFoundError:
+        return False
+    grace_period = timedelta(seconds=settings.IMAGE_RELEASE_GRACE_PERIOD)
+    return timezone.now() - modified < grace_period
+
+
+def acquire_image(name):
+    """Добавляет картинке ссылку ещё одного рецепта."""
+    if not name:
+        return
+    images = StoredImage.objects.filter(name=name)
+    if not images.update(references=F("references") + 1):
+        insert_ignore(StoredImage, name=name, references=0)
+        images.update(references=F("references") + 1)
+
+
+def remember_image(recipe):
+    """Запоминает прежнее имя картинки, если оно не пришло из from_db."""
+    if recipe._state.adding:
+        recipe.saved_image = None
+    elif recipe.saved_image is None and "image" in recipe.__dict__:
+        recipe.saved_image = (
+            Recipe.objects.filter(pk=recipe.pk).values_list("image", flat=True).first()
+        )
+
+
+def move_image_reference(recipe):
+    """Переносит ссылку рецепта со старой картинки на новую после save().
+
+    Так ссылки считаются при любом сохранении: через API, админку или shell.
+    """
+    if "image" not in recipe.__dict__:
+        return
+    name = recipe.image.name
+    if name == recipe.saved_image:
+        return
+    acquire_image(name)
+    schedule_release(recipe.saved_image)
+    recipe.saved_image = name
+
+
+def release_image(name):
+    """Удаляет картинку и её копии, если на неё не ссылается ни один рецепт.
+
+    Строка StoredImage блокируется на время проверки и удаления, а свежие
+    файлы не трогаются, поэтому параллельная загрузка той же картинки не
+    останется без файла. Счётчику ссылок одному не доверяем: рецепты
+    проверяются и по самой таблице.
+    """
+    if not name:
+        return False
+    storage = Recipe._meta.get_field("image").storage
+    with transaction.atomic():
+        image = StoredImage.objects.select_for_update().filter(name=name).first()
+        if (
+            image is not None
+            and image.references
+            or Recipe.objects.filter(image=name).exists()
+            or is_fresh(storage, name)
+        ):
+            return False
+        if image is not None:
+            image.delete()
+        storage.delete(name)
+        for rendition in RENDITIONS:
+            for extension, _ in FORMATS.values():
+                default_storage.delete(rendition_name(name, rendition, extension))
+    return True
+
+
+def schedule_release(name):
+    """Снимает ссылку рецепта на картинку и пробует удалить её после фиксации."""
+    if not name:
+        return
+    StoredImage.objects.filter(name=name, references__gt=0).update(
+        references=F("references") - 1
+    )
+    transaction.on_commit(lambda: release_image(name))
+
+
+def schedule_renditions(recipe):
+    """Ставит генерацию копий в фоновый поток после фиксации транзакции."""
+    if not recipe.image or recipe.image_renditions.get("source") == recipe.image.name:
+        return
+    transaction.on_commit(lambda: executor.submit(run_in_background, recipe.pk))
@@ -0,0 +1,124 @@
+import os
+import posixpath
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from api.images import FORMATS, RENDITIONS, is_fresh, rendition_name
+from recipes.models import Recipe, StoredImage
+from recipes.storage import content_hash
+
+
+class Command(BaseCommand):
+    help = (
+        "Переименовывает картинки рецептов по хэшу содержимого, объединяет "
+        "одинаковые файлы, пересчитывает ссылки на них и удаляет файлы, на "
+        "которые не ссылается ни один рецепт. Недавно изменённые файлы "
+        "не удаляются: их могла только что получить новая загрузка."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать, что будет сделано.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        field = Recipe._meta.get_field("image")
+        storage = field.storage
+        renamed = 0
+        names = (
+            Recipe.objects.exclude(image="")
+            .order_by()
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        for name in list(names):
+            if not storage.exists(name):
+                self.stderr.write(f"Нет файла {name}")
+                continue
+            with storage.open(name, "rb") as content:
+                target = posixpath.join(
+                    posixpath.dirname(name),
+                    content_hash(content) + os.path.splitext(name)[1].lower(),
+                )
+                if target == name:
+                    continue
+                if not dry_run and not storage.exists(target):
+                    target = storage.save(target, content)
+            renamed += 1
+            if not dry_run:
+                Recipe.objects.filter(image=name).update(
+                    image=target, image_renditions={}
+                )
+        self.stdout.write(f"Переименовано картинок: {renamed}")
+        if not dry_run:
+            self.count_references()
+        self.collect_garbage(storage, field.upload_to.rstrip("/"), dry_run)
+
+    def count_references(self):
+        names = (
+            Recipe.objects.exclude(image="")
+            .order_by()
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        with transaction.atomic():
+            StoredImage.objects.bulk_create(
+                (StoredImage(name=name) for name in names.iterator()),
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            references = (
+                Recipe.objects.filter(image=OuterRef("name"))
+                .order_by()
+                .values("image")
+                .annotate(total=Count("pk"))
+                .values("total")
+            )
+            StoredImage.objects.update(
+                references=Coalesce(
+                    Subquery(references, output_field=IntegerField()), 0
+                )
+            )
+
+    def collect_garbage(self, storage, directory, dry_run):
+        used = set(Recipe.objects.values_list("image", flat=True))
+        used.update(
+            StoredImage.objects.filter(references__gt=0).values_list(
+                "name", flat=True
+            )
+        )
+        renditions = {
+            rendition_name(name, rendition, extension)
+            for name in used
+            for rendition in RENDITIONS
+            for extension, _ in FORMATS.values()
+        }
+        removed = freed = 0
+        _, files = storage.listdir(directory)
+        for filename in files:
+            name = posixpath.join(directory, filename)
+            if name not in used and not is_fresh(storage, name):
+                freed += storage.size(name)
+                removed += 1
+                if not dry_run:
+                    storage.delete(name)
+        rendition_directory = posixpath.join(directory, "renditions")
+        if default_storage.exists(rendition_directory):
+            _, files = default_storage.listdir(rendition_directory)
+            for filename in files:
+                name = posixpath.join(rendition_directory, filename)
+                if name not in renditions and not is_fresh(default_storage, name):
+                    freed += default_storage.size(name)
+                    removed += 1
+                    if not dry_run:
+                        default_storage.delete(name)
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено файлов: {removed}, освобождено байт: {freed}")
+        )
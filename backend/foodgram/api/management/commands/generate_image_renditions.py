@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from api.images import generate_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Создаёт уменьшенные копии картинок для уже сохранённых рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать копии, даже если они уже есть.",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="").only(
+            "id", "image", "image_renditions"
+        )
+        done = failed = 0
+        for recipe in recipes.iterator():
+            if (
+                not options["force"]
+                and recipe.image_renditions.get("source") == recipe.image.name
+            ):
+                continue
+            try:
+                generate_renditions(recipe.pk, options["force"])
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f"Рецепт {recipe.pk}: {error}")
+                continue
+            done += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Готово: {done}, с ошибками: {failed}")
+        )
@@ -0,0 +1,169 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.caching import INGREDIENTS_GENERATION, bump_generation
+from api.search import bump_ingredient_index_version
+from recipes.models import Ingredient
+
+NAME_LENGTH = Ingredient._meta.get_field("name").max_length
+UNIT_LENGTH = Ingredient._meta.get_field("measurement_unit").max_length
+READ_SIZE = 1 << 16
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="") as source:
+        for row in csv.reader(source):
+            if len(row) >= 2:
+                yield row[0], row[1]
+            elif row:
+                yield row[0], ""
+
+
+def read_json(path):
+    """Читает массив объектов или JSON Lines, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    with open(path, encoding="utf-8") as source:
+        while True:
+            chunk = source.read(READ_SIZE)
+            buffer += chunk
+            position = 0
+            while True:
+                while position < len(buffer) and buffer[position] in "[], \t\r\n":
+                    position += 1
+                if position == len(buffer):
+                    break
+                try:
+                    item, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise CommandError(f"Некорректный JSON в {path}")
+                    break
+                yield item.get("name", ""), item.get("measurement_unit", "")
+            buffer = buffer[position:]
+            if not chunk:
+                return
+
+
+READERS = {".csv": read_csv, ".json": read_json, ".jsonl": read_json}
+
+
+class CsvStream(io.RawIOBase):
+    """Файлоподобный поток CSV-строк для COPY ... FROM STDIN."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = b""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            chunk = io.StringIO()
+            csv.writer(chunk).writerows(islice(self.rows, 1000))
+            if not chunk.tell():
+                break
+            self.buffer += chunk.getvalue().encode("utf-8")
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает справочник ингредиентов из CSV или JSON пачками. "
+        "Уже существующие ингредиенты пропускаются, поэтому повторный "
+        "запуск ничего не дублирует."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл ingredients.csv или ingredients.json.")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "json"),
+            help="Формат файла; по умолчанию определяется по расширению.",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.is_file():
+            raise CommandError(f"Файл {path} не найден")
+        if options["format"]:
+            reader = READERS[f".{options['format']}"]
+        else:
+            reader = READERS.get(path.suffix.lower())
+            if reader is None:
+                raise CommandError("Не удалось определить формат файла")
+        self.read = 0
+        self.skipped = 0
+        started = time.monotonic()
+        with transaction.atomic():
+            rows = self.clean(reader(path))
+            if connection.vendor == "postgresql":
+                created = self.load_postgresql(rows)
+            else:
+                created = self.load_bulk(rows, options["batch_size"])
+            if created:
+                transaction.on_commit(bump_ingredient_index_version)
+                bump_generation(INGREDIENTS_GENERATION)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        if self.skipped:
+            self.stderr.write(f"Пропущено некорректных строк: {self.skipped}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Прочитано {self.read}, добавлено {created} за {elapsed:.2f} с "
+                f"({self.read / elapsed:.0f} строк/с)"
+            )
+        )
+
+    def clean(self, rows):
+        for name, unit in rows:
+            self.read += 1
+            name, unit = str(name).strip(), str(unit).strip()
+            if not name or len(name) > NAME_LENGTH or len(unit) > UNIT_LENGTH:
+                self.skipped += 1
+                continue
+            yield name, unit
+
+    def load_postgresql(self, rows):
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE ingredient_staging "
+                "(name text, measurement_unit text) ON COMMIT DROP"
+            )
+            cursor.cursor.copy_expert(
+                "COPY ingredient_staging FROM STDIN WITH (FORMAT csv)",
+                CsvStream(rows),
+            )
+            cursor.execute(
+                f"INSERT INTO {table} (name, measurement_unit) "
+                "SELECT DISTINCT name, measurement_unit FROM ingredient_staging "
+                "ON CONFLICT (name, measurement_unit) DO NOTHING"
+            )
+            return cursor.rowcount
+
+    def load_bulk(self, rows, batch_size):
+        before = Ingredient.objects.count()
+        while True:
+            batch = [
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in islice(rows, batch_size)
+            ]
+            if not batch:
+                break
+            Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+        return Ingredient.objects.count() - before
@@ -0,0 +1,218 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+
+from django.db import connection
+
+from api.authentication import token_cache
+from api.caching import response_cache
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Остальная статистика кэшей — монотонные счётчики.
+GAUGES = ("size", "hit_rate")
+
+# Имя метрики, описание, корзины и поле RequestTimings с наблюдаемым значением.
+HISTOGRAMS = (
+    (
+        "request_duration_seconds",
+        "Полное время обработки запроса.",
+        DURATION_BUCKETS,
+        "total",
+    ),
+    ("db_duration_seconds", "Время SQL-запросов.", DURATION_BUCKETS, "db_time"),
+    ("db_queries", "Число SQL-запросов.", QUERY_BUCKETS, "db_queries"),
+    (
+        "validate_duration_seconds",
+        "Время валидации входных данных сериализатором.",
+        DURATION_BUCKETS,
+        "validate",
+    ),
+    (
+        "serialize_duration_seconds",
+        "Время сериализации ответа.",
+        DURATION_BUCKETS,
+        "serialize",
+    ),
+    ("render_duration_seconds", "Время рендеринга ответа.", DURATION_BUCKETS, "render"),
+    ("response_size_bytes", "Размер тела ответа.", SIZE_BUCKETS, "size"),
+)
+
+
+class RequestTimings:
+    """Замеры одного запроса; сам объект служит execute_wrapper для SQL."""
+
+    def __init__(self):
+        self.action = "unresolved"
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.validate = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.total = 0.0
+        self.size = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    def timed(self, field, func):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                setattr(self, field, getattr(self, field) + elapsed)
+
+        return wrapper
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing; SQL внутри сериализации входит
+        и в db, и в serialize."""
+        parts = [f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"']
+        for field in ("validate", "serialize", "render"):
+            value = getattr(self, field)
+            if value:
+                parts.append(f"{field};dur={value * 1000:.1f}")
+        parts.append(f"total;dur={self.total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield str(bound), cumulative
+        yield "+Inf", self.count
+
+
+class RequestMetrics:
+    """Гистограммы замеров по действиям представлений в памяти процесса."""
+
+    prefix = "foodgram_"
+
+    def __init__(self):
+        self.lock = Lock()
+        self.histograms = {}
+
+    def observe(self, timings):
+        with self.lock:
+            for name, _, buckets, field in HISTOGRAMS:
+                value = getattr(timings, field)
+                if value is None:
+                    continue
+                key = (name, timings.action)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(buckets)
+                self.histograms[key].observe(value)
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = []
+        with self.lock:
+            for name, description, _, _ in HISTOGRAMS:
+                metric = self.prefix + name
+                lines.append(f"# HELP {metric} {description}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (key, action), histogram in sorted(self.histograms.items()):
+                    if key != name:
+                        continue
+                    label = f'action="{action}"'
+                    for bound, count in histogram.samples():
+                        lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+                    lines.append(f"{metric}_sum{{{label}}} {histogram.sum:g}")
+                    lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+        for cache_name, stats in (
+            ("token_cache", token_cache.stats()),
+            ("response_cache", response_cache.stats()),
+        ):
+            for stat, value in stats.items():
+                metric = f"{self.prefix}{cache_name}_{stat}"
+                if stat in GAUGES:
+                    lines.append(f"# TYPE {metric} gauge")
+                else:
+                    metric += "_total"
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+class PerformanceMiddleware:
+    """Замеряет каждый запрос: SQL, валидацию, сериализацию, рендеринг и
+    размер ответа. Отдаёт их в Server-Timing и копит в request_metrics
+    по действию представления, например RecipeViewSet.list."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = request.timings = RequestTimings()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timings):
+            response = self.get_response(request)
+        # Потоковый ответ читает базу уже после выхода из middleware,
+        # поэтому его запросы и размер сюда не попадают.
+        timings.total = time.perf_counter() - started
+        if not response.streaming:
+            timings.size = len(response.content)
+        response["Server-Timing"] = timings.server_timing()
+        request_metrics.observe(timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "cls", None)
+        if view_class is None:
+            request.timings.action = request.resolver_match.view_name
+            return
+        method = request.method.lower()
+        actions = getattr(view_func, "actions", None) or {}
+        request.timings.action = (
+            f"{view_class.__name__}.{actions.get(method, method)}"
+        )
+
+    def process_template_response(self, request, response):
+        timings = request.timings
+        started = time.perf_counter()
+
+        def rendered(response):
+            timings.render += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class SerializerTimingMixin:
+    """Учитывает время валидации и сериализации в замерах запроса."""
+
+    def time_serializer(self, serializer):
+        timings = getattr(self.request, "timings", None)
+        if timings is not None:
+            serializer.is_valid = timings.timed("validate", serializer.is_valid)
+            serializer.to_representation = timings.timed(
+                "serialize", serializer.to_representation
+            )
+        return serializer
+
+    def get_serializer(self, *args, **kwargs):
+        return self.time_serializer(super().get_serializer(*args, **kwargs))
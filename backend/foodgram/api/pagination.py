@@ -1,6 +1,192 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from collections import OrderedDict
+from functools import reduce
+from hashlib import md5
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+def estimate_count(queryset):
+    """Оценка числа строк по плану запроса PostgreSQL."""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CachedCountPaginator(Paginator):
+    """Кэширует точный COUNT по сигнатуре запроса на PAGINATION_COUNT_TTL.
+
+    На PostgreSQL при оценке планировщика не меньше
+    PAGINATION_ESTIMATE_THRESHOLD отдаётся оценка, а count_exact = False.
+    """
+
+    count_exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, "query"):
+            return len(queryset)
+        queryset = queryset.order_by()
+        sql, params = queryset.query.sql_with_params()
+        key = "page_count:" + md5(f"{sql}{params}".encode()).hexdigest()
+        count = cache.get(key)
+        if count is not None:
+            return count
+        threshold = settings.PAGINATION_ESTIMATE_THRESHOLD
+        if threshold and connections[queryset.db].vendor == "postgresql":
+            estimate = estimate_count(queryset)
+            if estimate >= threshold:
+                self.count_exact = False
+                return estimate
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_TTL)
+        return count
+
+
+class LimitCursorPagination(CursorPagination):
+    """Курсор по всему ключу сортировки.
+
+    DRF сравнивает только первое поле сортировки и добирает совпадения
+    смещением, поэтому при равных pub_date страницы теряют или повторяют
+    записи. Здесь позиция хранит значения всех полей, последнее из которых
+    уникально: смещение не нужно, а фильтр раскрывается в сравнение кортежей.
+    """
+
+    page_size = 6
+    page_size_query_param = "limit"
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, self.cursor.position
+        if reverse:
+            queryset = queryset.order_by(*self.reversed_ordering())
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.after(current_position, reverse))
+
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def reversed_ordering(self):
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}"
+            for field in self.ordering
+        )
+
+    def after(self, position, reverse):
+        """Условие «строго после position» в порядке выдачи."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") != reverse else "gt"
+            equal = {
+                previous.lstrip("-"): value
+                for previous, value in zip(self.ordering[:index], values)
+            }
+            conditions.append(Q(**equal, **{f"{name}__{lookup}": values[index]}))
+        return reduce(or_, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps(
+            [
+                str(
+                    instance[field.lstrip("-")]
+                    if isinstance(instance, dict)
+                    else getattr(instance, field.lstrip("-"))
+                )
+                for field in ordering
+            ]
+        )
 
 
 class LimitPageNumberPagination(PageNumberPagination):
+    """Постраничная выдача с параметром limit.
+
+    Представления с атрибутом cursor_ordering поддерживают также курсорный
+    режим (?pagination=cursor): страница ищется по ключу сортировки, без
+    OFFSET и без подсчёта COUNT(*).
+    """
+
     page_size = 6
     page_size_query_param = "limit"
+    max_page_size = settings.MAX_PAGE_SIZE
+    django_paginator_class = CachedCountPaginator
+    cursor_mode_query_param = "pagination"
+    cursor_paginator = None
+
+    def use_cursor(self, request, view):
+        return getattr(view, "cursor_ordering", None) and (
+            request.query_params.get(self.cursor_mode_query_param) == "cursor"
+            or LimitCursorPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(request, view):
+            self.cursor_paginator = None
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = LimitCursorPagination()
+        self.cursor_paginator.ordering = view.cursor_ordering
+        return self.cursor_paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        paginator = self.page.paginator
+        return Response(
+            OrderedDict(
+                [
+                    ("count", paginator.count),
+                    ("count_exact", paginator.count_exact),
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
@@ -0,0 +1,83 @@
+from bisect import bisect_left
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Ingredient
+
+INGREDIENT_INDEX_VERSION_KEY = "ingredient_index_version"
+
+
+def bump_ingredient_index_version():
+    cache.set(
+        INGREDIENT_INDEX_VERSION_KEY, uuid4().hex, settings.CACHE_GENERATION_TTL
+    )
+
+
+class IngredientIndex:
+    """Префиксный индекс ингредиентов в памяти процесса.
+
+    Индекс перестраивается, когда меняется версия в кэше; её сдвигают
+    сигналы сохранения и удаления Ingredient.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.keys = []
+        self.items = []
+
+    def get_version(self):
+        version = cache.get(INGREDIENT_INDEX_VERSION_KEY)
+        if version is None:
+            cache.add(
+                INGREDIENT_INDEX_VERSION_KEY,
+                uuid4().hex,
+                settings.CACHE_GENERATION_TTL,
+            )
+            version = cache.get(INGREDIENT_INDEX_VERSION_KEY)
+        return version
+
+    def build(self, version):
+        from api.serializers import IngredientSerializer
+
+        rows = sorted(
+            (
+                (item["name"].casefold(), dict(item))
+                for item in IngredientSerializer(
+                    Ingredient.objects.all(), many=True
+                ).data
+            ),
+            key=lambda row: row[0],
+        )
+        self.keys = [key for key, _ in rows]
+        self.items = [item for _, item in rows]
+        self.version = version
+
+    def search(self, name, limit=None):
+        """Сначала совпадения по началу названия, затем по подстроке."""
+        if limit is None:
+            limit = settings.INGREDIENT_SEARCH_LIMIT
+        version = self.get_version()
+        if version != self.version:
+            self.build(version)
+        keys, items = self.keys, self.items
+        query = name.casefold()
+        result = []
+        position = bisect_left(keys, query)
+        while (
+            position < len(keys)
+            and len(result) < limit
+            and keys[position].startswith(query)
+        ):
+            result.append(items[position])
+            position += 1
+        for key, item in zip(keys, items):
+            if len(result) >= limit:
+                break
+            if query in key and not key.startswith(query):
+                result.append(item)
+        return result
+
+
+ingredient_index = IngredientIndex()
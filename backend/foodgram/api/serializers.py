@@ -1,6 +1,7 @@
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
@@ -14,7 +15,50 @@ from recipes.models import (
     FavoriteRecipe,
     ShoppingCart,
 )
-from api.utils import create_update_ingredients
+from api.fields import LimitedBase64ImageField
+from api.utils import (
+    create_update_ingredients,
+    get_recipes_limit,
+    parse_multipart_recipe,
+)
+
+
+class RecipeImageField(serializers.Field):
+    """URL уменьшенной копии картинки рецепта.
+
+    Без rendition копия выбирается по действию: detail для retrieve, card
+    для остальных. Пока копии нет, отдаётся оригинал (для WebP — None).
+    """
+
+    def __init__(self, rendition=None, image_format="jpeg", **kwargs):
+        self.rendition = rendition
+        self.image_format = image_format
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def get_rendition(self):
+        if self.rendition is not None:
+            return self.rendition
+        view = self.context.get("view")
+        if view is not None and getattr(view, "action", None) == "retrieve":
+            return "detail"
+        return "card"
+
+    def to_representation(self, recipe):
+        renditions = recipe.image_renditions or {}
+        name = renditions.get(self.get_rendition(), {}).get(self.image_format)
+        if renditions.get("source") != recipe.image.name:
+            name = None
+        if name is None:
+            if self.image_format != "jpeg" or not recipe.image:
+                return None
+            name = recipe.image.name
+        url = default_storage.url(name)
+        request = self.context.get("request")
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -41,6 +85,8 @@ class CustomUserSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         user = self.context["request"].user
         if user.is_anonymous:
             return False
@@ -82,17 +128,21 @@ class FollowSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(user=obj.user, author=obj.author).exists()
+        return True
 
     def get_recipes(self, obj):
-        request = self.context.get("request")
-        limit = request.GET.get("recipes_limit")
-        queryset = Recipe.objects.filter(author=obj.author)
-        if limit:
-            queryset = queryset[: int(limit)]
+        if hasattr(obj, "author_recipes"):
+            queryset = obj.author_recipes
+        else:
+            limit = get_recipes_limit(self.context.get("request"))
+            queryset = Recipe.objects.filter(author=obj.author)
+            if limit:
+                queryset = queryset[:limit]
         return ShoppingCartValidateSerializer(queryset, many=True).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, "recipes_count"):
+            return obj.recipes_count
         return Recipe.objects.filter(author=obj.author).count()
 
     def validate(self, data):
@@ -155,7 +205,8 @@ class IngredientCreateSerializer(serializers.ModelSerializer):
 class RecipeListSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer()
-    image = Base64ImageField()
+    image = RecipeImageField()
+    image_webp = RecipeImageField(image_format="webp")
     ingredients = AmountSerializer(many=True, source="ingredient_recipe")
     is_favorited = serializers.SerializerMethodField(method_name="get_is_favorited")
     is_in_shopping_cart = serializers.SerializerMethodField(
@@ -171,19 +222,29 @@ class RecipeListSerializer(serializers.ModelSerializer):
             "ingredients",
             "name",
             "image",
+            "image_webp",
             "text",
             "cooking_time",
             "is_favorited",
             "is_in_shopping_cart",
         )
 
+    def to_representation(self, instance):
+        if hasattr(instance, "author_is_subscribed"):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         user = self.context["request"].user
         if user.is_anonymous:
             return False
         return Recipe.objects.filter(favorite_recipe__user=user, id=obj.id).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         user = self.context["request"].user
         if user.is_anonymous:
             return False
@@ -192,7 +253,7 @@ class RecipeListSerializer(serializers.ModelSerializer):
 
 class RecipeSerializer(serializers.ModelSerializer):
     ingredients = IngredientCreateSerializer(many=True)
-    image = Base64ImageField()
+    image = LimitedBase64ImageField()
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
 
@@ -209,27 +270,38 @@ class RecipeSerializer(serializers.ModelSerializer):
             "cooking_time",
         )
 
+    def __init__(self, *args, **kwargs):
+        data = kwargs.get("data")
+        if hasattr(data, "getlist"):
+            kwargs["data"] = parse_multipart_recipe(data)
+        super().__init__(*args, **kwargs)
+
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get("image")
+            if image is not None:
+                image.close()
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop("ingredients")
         recipe = Recipe.objects.create(**validated_data)
         tags_data = self.initial_data.get("tags")
         recipe.tags.set(tags_data)
         create_update_ingredients(recipe, ingredients)
-        recipe.save()
         recipe.is_favorited = False
         recipe.is_in_shopping_cart = False
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop("ingredients")
         super().update(instance, validated_data)
-        instance.tags.clear()
         tags_data = self.initial_data.get("tags")
         instance.tags.set(tags_data)
-        RecipeIngredient.objects.filter(recipe=instance).all().delete()
-        recipe = instance
-        create_update_ingredients(recipe, ingredients)
-        instance.save()
+        create_update_ingredients(instance, ingredients)
         return instance
 
     def validate(self, data):
@@ -243,14 +315,16 @@ class RecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 {"ingredients": "Нужен хоть один ингридиент для рецепта"}
             )
-        ingredient_list = []
+        ingredient_ids = [int(ingredient_item["id"]) for ingredient_item in ingredients]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise serializers.ValidationError("Ингридиенты должны " "быть уникальными")
+        found = Ingredient.objects.in_bulk(ingredient_ids)
+        missing = set(ingredient_ids) - found.keys()
+        if missing:
+            raise serializers.ValidationError(
+                {"ingredients": f"Ингредиенты не найдены: {sorted(missing)}"}
+            )
         for ingredient_item in ingredients:
-            ingredient = get_object_or_404(Ingredient, id=ingredient_item["id"])
-            if ingredient in ingredient_list:
-                raise serializers.ValidationError(
-                    "Ингридиенты должны " "быть уникальными"
-                )
-            ingredient_list.append(ingredient)
             if int(ingredient_item["amount"]) < 0:
                 raise serializers.ValidationError(
                     {
@@ -290,7 +364,17 @@ class FavoriteValidateSerializer(serializers.ModelSerializer):
         return data
 
 
+class RecipeBatchSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=True,
+        max_length=settings.RECIPE_BATCH_LIMIT,
+    )
+
+
 class ShoppingCartValidateSerializer(serializers.ModelSerializer):
+    image = RecipeImageField(rendition="small")
+
     class Meta:
         model = Recipe
         fields = ("id", "name", "image", "cooking_time")
@@ -0,0 +1,129 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.caching import (
+    INGREDIENTS_GENERATION,
+    RECIPE_LIST_GENERATION,
+    RECIPE_SHARED_GENERATION,
+    TAGS_GENERATION,
+    bump_generation,
+    recipe_generation,
+)
+from api.images import (
+    move_image_reference,
+    remember_image,
+    schedule_release,
+    schedule_renditions,
+)
+from api.search import bump_ingredient_index_version
+from api.utils import change_counter, reset_tag_registry
+from recipes.models import (
+    FavoriteRecipe,
+    Follow,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+    User,
+    count_of,
+)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(created=False, **kwargs):
+    transaction.on_commit(bump_ingredient_index_version)
+    if created:
+        # Новый ингредиент ещё не входит ни в один рецепт.
+        bump_generation(INGREDIENTS_GENERATION)
+    else:
+        bump_generation(INGREDIENTS_GENERATION, RECIPE_SHARED_GENERATION)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    transaction.on_commit(reset_tag_registry)
+    bump_generation(RECIPE_SHARED_GENERATION, TAGS_GENERATION)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    bump_generation(RECIPE_LIST_GENERATION, recipe_generation(instance.pk))
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_saving(instance, update_fields=None, **kwargs):
+    if update_fields is None or "image" in update_fields:
+        remember_image(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, created, update_fields=None, **kwargs):
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), "recipes_count", 1
+        )
+    if update_fields is None or "image" in update_fields:
+        move_image_reference(instance)
+    schedule_renditions(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    change_counter(User.objects.filter(pk=instance.author_id), "recipes_count", -1)
+    schedule_release(instance.image.name)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(instance, **kwargs):
+    change_counter(User.objects.filter(pk=instance.author_id), "followers_count", -1)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(instance, **kwargs):
+    bump_generation(RECIPE_LIST_GENERATION, recipe_generation(instance.recipe_id))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, created, update_fields=None, **kwargs):
+    if created:
+        # У нового пользователя нет ни токенов, ни рецептов.
+        return
+    if update_fields is None or {"password", "is_active"} & set(update_fields):
+        token_cache.invalidate_user(instance.pk)
+    if update_fields is None or set(update_fields) != {"last_login"}:
+        bump_generation(RECIPE_SHARED_GENERATION)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(instance, **kwargs):
+    # Избранное и покупки пользователя удалятся каскадом без пересчёта
+    # счётчиков рецептов; запоминаем рецепты, чтобы пересчитать их после.
+    instance.counted_recipes = list(
+        FavoriteRecipe.objects.filter(user=instance)
+        .order_by()
+        .values_list("recipe_id", flat=True)
+        .union(
+            ShoppingCart.objects.filter(user=instance)
+            .order_by()
+            .values_list("recipe_id", flat=True)
+        )
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(instance, **kwargs):
+    Recipe.objects.filter(pk__in=getattr(instance, "counted_recipes", ())).update(
+        favorites_count=count_of(FavoriteRecipe, "recipe"),
+        in_carts_count=count_of(ShoppingCart, "recipe"),
+    )
+    token_cache.invalidate_user(instance.pk)
+    bump_generation(RECIPE_SHARED_GENERATION)
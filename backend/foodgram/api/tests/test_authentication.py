@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.authentication import TokenCache, token_cache
+from recipes.models import User
+
+
+class CachedTokenAuthenticationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="reader@example.com", username="reader", password="pass"
+        )
+
+    def setUp(self):
+        token_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def me(self):
+        return self.client.get("/api/users/me/")
+
+    def test_second_request_uses_cache(self):
+        hits, misses = token_cache.hits, token_cache.misses
+        with self.assertNumQueries(1):
+            self.assertEqual(self.me().status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.me().status_code, 200)
+        self.assertEqual(token_cache.misses - misses, 1)
+        self.assertEqual(token_cache.hits - hits, 1)
+
+    def test_logout_revokes_cached_token(self):
+        self.me()
+        response = self.client.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_password_change_evicts_user(self):
+        self.me()
+        self.user.set_password("new-pass")
+        self.user.save()
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_deactivated_user_is_rejected(self):
+        self.me()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_last_login_keeps_entry(self):
+        self.me()
+        self.user.save(update_fields=["last_login"])
+        self.assertIsNotNone(token_cache.get(self.token.key))
+
+
+class TokenCacheTest(SimpleTestCase):
+    def test_entry_expires_after_ttl(self):
+        cache = TokenCache(maxsize=10, ttl=60)
+        with mock.patch("api.authentication.monotonic", return_value=1000):
+            cache.set("key", "credentials")
+        with mock.patch("api.authentication.monotonic", return_value=1059):
+            self.assertEqual(cache.get("key"), "credentials")
+        with mock.patch("api.authentication.monotonic", return_value=1061):
+            self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.stats(), {"size": 0, "hits": 1, "misses": 1})
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TokenCache(maxsize=2, ttl=60)
+        cache.set("first", 1)
+        cache.set("second", 2)
+        cache.get("first")
+        cache.set("third", 3)
+        self.assertIsNone(cache.get("second"))
+        self.assertEqual(cache.get("first"), 1)
+        self.assertEqual(cache.get("third"), 3)
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_zero_size_disables_cache(self):
+        cache = TokenCache(maxsize=0, ttl=60)
+        cache.set("key", "credentials")
+        self.assertIsNone(cache.get("key"))
@@ -0,0 +1,220 @@
+from threading import Barrier, Thread
+from unittest import skipIf
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from foodgram import settings as project_settings
+from recipes.models import Ingredient, Recipe, RecipeIngredient, User
+
+
+class AnonymousRecipeCacheTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email="author@example.com", username="author", password="pass"
+        )
+        cls.ingredient = Ingredient.objects.create(name="мука", measurement_unit="г")
+        cls.recipe = Recipe.objects.create(
+            author=author,
+            name="Блины",
+            text="Описание",
+            image="recipes/images/test.png",
+            cooking_time=20,
+        )
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=200
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def ingredient_names(self, data):
+        return [item["name"] for item in data["ingredients"]]
+
+    def test_ingredient_rename_invalidates_cached_recipes(self):
+        detail_url = f"/api/recipes/{self.recipe.id}/"
+        response = self.client.get("/api/recipes/")
+        self.assertEqual(self.ingredient_names(response.data["results"][0]), ["мука"])
+        self.assertEqual(
+            self.ingredient_names(self.client.get(detail_url).data), ["мука"]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredient.name = "мука пшеничная"
+            self.ingredient.save()
+
+        response = self.client.get("/api/recipes/")
+        self.assertEqual(
+            self.ingredient_names(response.data["results"][0]), ["мука пшеничная"]
+        )
+        self.assertEqual(
+            self.ingredient_names(self.client.get(detail_url).data),
+            ["мука пшеничная"],
+        )
+
+
+class ResponseCacheBurstTest(TransactionTestCase):
+    """Одновременные запросы к холодному ключу считают ответ один раз.
+
+    Блокировка держится, только если add() бэкенда атомарен: этот тест
+    проверяет её на LocMemCache тестов, DefaultCacheBurstTest — на кэше
+    из настроек проекта.
+    """
+
+    requests = 20
+
+    def setUp(self):
+        call_command("createcachetable", verbosity=0)
+        cache.clear()
+        author = User.objects.create_user(
+            email="author@example.com", username="author", password="pass"
+        )
+        ingredient = Ingredient.objects.create(name="мука", measurement_unit="г")
+        for i in range(10):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f"Рецепт {i}",
+                text="Описание",
+                image="recipes/images/test.png",
+                cooking_time=20,
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=100
+            )
+
+    def fetch(self, barrier, queries, responses):
+        def count(execute, sql, params, many, context):
+            if not self.is_cache_query(sql):
+                queries.append(sql)
+            return execute(sql, params, many, context)
+
+        try:
+            with connection.execute_wrapper(count):
+                barrier.wait()
+                response = APIClient().get("/api/recipes/")
+            responses.append((response.status_code, response.data))
+        finally:
+            connection.close()
+
+    def is_cache_query(self, sql):
+        """Запрос DatabaseCache или управление его транзакцией."""
+        default = settings.CACHES["default"]
+        if not default["BACKEND"].endswith("DatabaseCache"):
+            return False
+        return default["LOCATION"] in sql or sql.startswith(
+            ("BEGIN", "SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK")
+        )
+
+    def test_burst_runs_view_queries_once(self):
+        with CaptureQueriesContext(connection) as single:
+            expected = self.client.get("/api/recipes/").data
+        view_queries = [
+            query
+            for query in single.captured_queries
+            if not self.is_cache_query(query["sql"])
+        ]
+        cache.clear()
+
+        queries, responses = [], []
+        barrier = Barrier(self.requests)
+        threads = [
+            Thread(target=self.fetch, args=(barrier, queries, responses))
+            for _ in range(self.requests)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(responses), self.requests)
+        for status, data in responses:
+            self.assertEqual(status, 200)
+            self.assertEqual(data, expected)
+        self.assertEqual(len(queries), len(view_queries))
+
+
+class RecipeConditionalGetTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email="author@example.com", username="author", password="pass"
+        )
+        cls.ingredient = Ingredient.objects.create(name="мука", measurement_unit="г")
+        cls.recipe = Recipe.objects.create(
+            author=author,
+            name="Блины",
+            text="Описание",
+            image="recipes/images/test.png",
+            cooking_time=20,
+        )
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=200
+        )
+        cls.url = f"/api/recipes/{cls.recipe.id}/"
+
+    def setUp(self):
+        cache.clear()
+
+    def test_not_modified_until_related_data_changes(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertFalse(response.has_header("Last-Modified"))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredient.name = "мука пшеничная"
+            self.ingredient.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["ingredients"][0]["name"], "мука пшеничная")
+        etag = response["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            amount = RecipeIngredient.objects.get(recipe=self.recipe)
+            amount.amount = 300
+            amount.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["ingredients"][0]["amount"], 300)
+
+    def test_creation_keeps_cached_recipes(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        # Новые пользователь и ингредиент ещё не входят ни в один рецепт.
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(
+                email="reader@example.com", username="reader", password="pass"
+            )
+            Ingredient.objects.create(name="соль", measurement_unit="г")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_alone_is_not_answered_with_304(self):
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT"
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+@skipIf(
+    connection.vendor == "sqlite"
+    and project_settings.CACHES["default"]["BACKEND"].endswith("DatabaseCache"),
+    "У SQLite параллельные транзакции DatabaseCache получают «database is "
+    "locked» вместо ожидания; тест идёт на PostgreSQL (ENGINE) или Redis.",
+)
+@override_settings(CACHES=project_settings.CACHES)
+class DefaultCacheBurstTest(ResponseCacheBurstTest):
+    """Та же проверка на кэше из настроек проекта, как в развёртывании.
+
+    Потоки ходят в кэш и базу своими соединениями, как разные воркеры.
+    """
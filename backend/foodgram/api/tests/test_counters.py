@@ -0,0 +1,151 @@
+import base64
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.models import (
+    FavoriteRecipe,
+    Follow,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag,
+    User,
+)
+
+
+def png_data_uri():
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "orange").save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+class CountersTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="reader@example.com", username="reader", password="pass"
+        )
+        cls.author = User.objects.create_user(
+            email="author@example.com", username="author", password="pass"
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="Блины",
+            text="Описание",
+            image="static/recipe/test.png",
+            cooking_time=20,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def recipe_counters(self):
+        self.recipe.refresh_from_db()
+        return self.recipe.favorites_count, self.recipe.in_carts_count
+
+    def test_favorite_and_cart(self):
+        for url, counters in (
+            (f"/api/recipes/{self.recipe.pk}/favorite/", (1, 0)),
+            (f"/api/recipes/{self.recipe.pk}/shopping_cart/", (1, 1)),
+        ):
+            with self.subTest(url):
+                self.assertEqual(self.client.post(url).status_code, 201)
+                self.assertEqual(self.client.post(url).status_code, 400)
+                self.assertEqual(self.recipe_counters(), counters)
+        url = f"/api/recipes/{self.recipe.pk}/favorite/"
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assertEqual(self.recipe_counters(), (0, 1))
+
+    def test_batch(self):
+        url = "/api/recipes/shopping_cart/"
+        for _ in range(2):
+            response = self.client.post(
+                url, {"recipes": [self.recipe.pk]}, format="json"
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.recipe_counters(), (0, 1))
+        self.client.delete(url)
+        self.assertEqual(self.recipe_counters(), (0, 0))
+
+    def test_subscribe(self):
+        url = f"/api/users/{self.author.pk}/subscribe/"
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+
+    def test_recipes_count(self):
+        tag = Tag.objects.create(name="Завтрак", color="#FFAA00", slug="breakfast")
+        ingredient = Ingredient.objects.create(name="мука", measurement_unit="г")
+        response = self.client.post(
+            "/api/recipes/",
+            {
+                "ingredients": [{"id": ingredient.pk, "amount": 200}],
+                "tags": [tag.pk],
+                "image": png_data_uri(),
+                "name": "Оладьи",
+                "text": "Описание",
+                "cooking_time": 15,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 1)
+        response = self.client.delete(f"/api/recipes/{response.data['id']}/")
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 0)
+
+    def test_recipes_count_outside_api(self):
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
+        recipe = Recipe.objects.create(
+            author=self.author,
+            name="Оладьи",
+            text="Описание",
+            image="static/recipe/test.png",
+            cooking_time=15,
+        )
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 2)
+        recipe.delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
+
+    def test_user_deletion_cascade(self):
+        follower = User.objects.create_user(
+            email="follower@example.com", username="follower", password="pass"
+        )
+        Follow.objects.create(user=follower, author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        User.objects.filter(pk=self.author.pk).update(followers_count=2)
+        FavoriteRecipe.objects.create(user=follower, recipe=self.recipe)
+        ShoppingCart.objects.create(user=follower, recipe=self.recipe)
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            favorites_count=1, in_carts_count=1
+        )
+        follower.delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(self.recipe_counters(), (0, 0))
+
+    def test_recount_counters_fixes_drift(self):
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipe)
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            favorites_count=5, in_carts_count=2
+        )
+        User.objects.filter(pk=self.author.pk).update(recipes_count=0)
+        call_command("recount_counters", stdout=io.StringIO())
+        self.assertEqual(self.recipe_counters(), (1, 0))
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
@@ -0,0 +1,50 @@
+import base64
+import io
+import os
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from rest_framework import serializers
+
+from api.fields import LimitedBase64ImageField
+
+
+def data_uri(size=(64, 64)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "orange").save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+class LimitedBase64ImageFieldTest(SimpleTestCase):
+    def decode(self, data):
+        """Разбирает data и возвращает ошибку и временный файл из base64."""
+        field = LimitedBase64ImageField()
+        decoded = []
+        decode_to_file = field.decode_to_file
+
+        def remember(value):
+            decoded.append(decode_to_file(value))
+            return decoded[-1]
+
+        with mock.patch.object(field, "decode_to_file", remember):
+            with self.assertRaises(serializers.ValidationError) as context:
+                field.to_internal_value(data)
+        return context.exception, decoded[0]
+
+    def test_valid_image(self):
+        file = LimitedBase64ImageField().to_internal_value(data_uri())
+        self.assertTrue(file.name.endswith(".png"))
+        file.close()
+
+    def test_temporary_file_is_removed_when_image_is_rejected(self):
+        cases = {
+            "не картинка": "data:image/png;base64,"
+            + base64.b64encode(b"not an image").decode(),
+            "слишком много пикселей": data_uri((200, 200)),
+        }
+        for case, data in cases.items():
+            with self.subTest(case), override_settings(IMAGE_MAX_PIXELS=100 * 100):
+                _, file = self.decode(data)
+                self.assertTrue(file.closed)
+                self.assertFalse(os.path.exists(file.temporary_file_path()))
@@ -0,0 +1,147 @@
+import io
+import os
+import time
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from api.images import generate_renditions, release_image
+from recipes.models import Recipe, StoredImage, User
+
+
+def png(color="orange", size=(800, 600)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def make_old(name):
+    hour_ago = time.time() - 3600
+    os.utime(default_storage.path(name), (hour_ago, hour_ago))
+
+
+class RecipeImageTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", username="author", password="pass"
+        )
+
+    def create_recipe(self, content):
+        recipe = Recipe(
+            author=self.author, name="Блины", text="Описание", cooking_time=20
+        )
+        recipe.image.save("upload.png", ContentFile(content), save=False)
+        recipe.save()
+        return recipe
+
+
+class RenditionsTest(RecipeImageTestCase):
+
+    def stat(self, recipe):
+        recipe.refresh_from_db()
+        name = recipe.image_renditions["card"]["jpeg"]
+        return os.stat(default_storage.path(name))
+
+    def test_shared_renditions_are_reused(self):
+        content = png()
+        first = self.create_recipe(content)
+        self.assertTrue(generate_renditions(first.pk))
+        before = self.stat(first)
+
+        second = self.create_recipe(content)
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertTrue(generate_renditions(second.pk))
+        after = self.stat(second)
+        self.assertEqual(before.st_ino, after.st_ino)
+        self.assertEqual(before.st_mtime_ns, after.st_mtime_ns)
+
+    def test_force_replaces_renditions_in_place(self):
+        recipe = self.create_recipe(png("green"))
+        generate_renditions(recipe.pk)
+        before = self.stat(recipe)
+        self.assertTrue(generate_renditions(recipe.pk, force=True))
+        after = self.stat(recipe)
+        self.assertNotEqual(before.st_ino, after.st_ino)
+        recipe.refresh_from_db()
+        for formats in (recipe.image_renditions[name] for name in ("card", "small")):
+            for name in formats.values():
+                self.assertTrue(default_storage.exists(name))
+                self.assertFalse(name.endswith(".tmp"))
+
+
+@override_settings(IMAGE_RELEASE_GRACE_PERIOD=60)
+class ImageReleaseTest(RecipeImageTestCase):
+    def references(self, name):
+        return StoredImage.objects.get(name=name).references
+
+    def delete(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+
+    def test_image_is_kept_while_referenced(self):
+        content = png()
+        first = self.create_recipe(content)
+        second = self.create_recipe(content)
+        name = first.image.name
+        self.assertEqual(self.references(name), 2)
+        make_old(name)
+
+        self.delete(first)
+        self.assertEqual(self.references(name), 1)
+        self.assertTrue(default_storage.exists(name))
+
+        self.delete(second)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+
+    def test_image_replaced_outside_api(self):
+        first = self.create_recipe(png("black"))
+        second = self.create_recipe(png("yellow"))
+        old_name, shared = first.image.name, second.image.name
+        make_old(old_name)
+        first = Recipe.objects.get(pk=first.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.image.save("upload.png", ContentFile(png("yellow")))
+        self.assertEqual(first.image.name, shared)
+        self.assertEqual(self.references(shared), 2)
+        self.assertFalse(default_storage.exists(old_name))
+
+        make_old(shared)
+        self.delete(second)
+        self.assertTrue(default_storage.exists(shared))
+        self.assertEqual(self.references(shared), 1)
+
+    def test_release_checks_recipes_despite_counter(self):
+        recipe = self.create_recipe(png("purple"))
+        name = recipe.image.name
+        StoredImage.objects.filter(name=name).update(references=0)
+        make_old(name)
+        self.assertFalse(release_image(name))
+        self.assertTrue(default_storage.exists(name))
+
+    def test_reused_file_survives_release(self):
+        content = png("blue")
+        recipe = self.create_recipe(content)
+        name = recipe.image.name
+        recipe.delete()
+        self.assertEqual(self.references(name), 0)
+        make_old(name)
+        # Та же картинка загружается заново, а рецепт с ней ещё не сохранён.
+        storage = Recipe._meta.get_field("image").storage
+        saved = storage.save("static/recipe/upload.png", ContentFile(content))
+        self.assertEqual(saved, name)
+        self.assertFalse(release_image(name))
+        self.assertTrue(default_storage.exists(name))
+
+    def test_garbage_collection_skips_fresh_files(self):
+        self.create_recipe(png("white"))
+        fresh = default_storage.save("static/recipe/fresh.png", ContentFile(png("red")))
+        stale = default_storage.save("static/recipe/stale.png", ContentFile(png("red")))
+        make_old(stale)
+        call_command("dedupe_images", stdout=io.StringIO())
+        self.assertTrue(default_storage.exists(fresh))
+        self.assertFalse(default_storage.exists(stale))
@@ -0,0 +1,60 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient
+
+
+def trigram_installed():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+class IngredientSearchTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name="абрикосовое варенье", measurement_unit="г"),
+                Ingredient(name="сушёный абрикос", measurement_unit="г"),
+                Ingredient(name="яблоко", measurement_unit="шт"),
+            ]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_prefix_and_substring_modes(self):
+        response = self.client.get("/api/ingredients/", {"contains": "абрикос"})
+        self.assertEqual(
+            {item["name"] for item in response.data},
+            {"абрикосовое варенье", "сушёный абрикос"},
+        )
+        response = self.client.get("/api/ingredients/", {"name": "абр"})
+        self.assertEqual(
+            [item["name"] for item in response.data],
+            ["абрикосовое варенье", "сушёный абрикос"],
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "индексы есть только в PostgreSQL")
+class IngredientSearchPlanTest(APITestCase):
+    """Планы поиска используют индексы из миграции 0002."""
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def test_istartswith_uses_prefix_index(self):
+        plan = self.explain(Ingredient.objects.filter(name__istartswith="абр"))
+        self.assertIn("ingredient_name_upper_prefix", plan)
+
+    def test_icontains_uses_trigram_index(self):
+        if not trigram_installed():
+            self.skipTest("расширение pg_trgm не установлено")
+        plan = self.explain(Ingredient.objects.filter(name__icontains="брик"))
+        self.assertIn("ingredient_name_upper_trgm", plan)
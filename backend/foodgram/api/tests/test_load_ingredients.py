@@ -0,0 +1,70 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from api.caching import INGREDIENTS_GENERATION, get_generation
+from api.search import ingredient_index
+from recipes.models import Ingredient
+
+
+class LoadIngredientsTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, filename, content):
+        path = os.path.join(self.directory, filename)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def load(self, path):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("load_ingredients", path, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def ingredients(self):
+        return set(Ingredient.objects.values_list("name", "measurement_unit"))
+
+    def test_csv_rerun_adds_nothing(self):
+        path = self.write("ingredients.csv", "мука,г\nсоль,г\n,г\nмука,г\nмолоко\n")
+        stdout, stderr = self.load(path)
+        self.assertIn("добавлено 3", stdout)
+        self.assertIn("Пропущено некорректных строк: 1", stderr)
+        stdout, _ = self.load(path)
+        self.assertIn("добавлено 0", stdout)
+        self.assertEqual(
+            self.ingredients(), {("мука", "г"), ("соль", "г"), ("молоко", "")}
+        )
+
+    def test_json_array_and_lines(self):
+        items = [
+            {"name": "сахар", "measurement_unit": "г"},
+            {"name": "яйца", "measurement_unit": "шт."},
+        ]
+        self.load(self.write("ingredients.json", json.dumps(items, ensure_ascii=False)))
+        self.load(
+            self.write(
+                "more.jsonl",
+                "\n".join(
+                    json.dumps(item, ensure_ascii=False)
+                    for item in items + [{"name": "мёд", "measurement_unit": "г"}]
+                ),
+            )
+        )
+        self.assertEqual(
+            self.ingredients(), {("сахар", "г"), ("яйца", "шт."), ("мёд", "г")}
+        )
+
+    def test_caches_are_bumped_after_load(self):
+        generation = get_generation(INGREDIENTS_GENERATION)
+        version = ingredient_index.get_version()
+        self.load(self.write("ingredients.csv", "мука,г\n"))
+        self.assertNotEqual(get_generation(INGREDIENTS_GENERATION), generation)
+        self.assertNotEqual(ingredient_index.get_version(), version)
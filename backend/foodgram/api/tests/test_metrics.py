@@ -0,0 +1,59 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import User
+
+SERVER_TIMING = re.compile(r'^db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+class PerformanceMiddlewareTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="reader@example.com", username="reader", password="pass"
+        )
+        cls.admin = User.objects.create_user(
+            email="admin@example.com",
+            username="admin",
+            password="pass",
+            is_staff=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/recipes/")
+        match = SERVER_TIMING.match(response["Server-Timing"])
+        self.assertIsNotNone(match, response["Server-Timing"])
+        self.assertEqual(int(match.group(1)), len(context.captured_queries))
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+    def test_metrics_require_staff(self):
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 401)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+
+    def test_metrics_are_prometheus_text(self):
+        self.client.get("/api/recipes/")
+        self.client.force_authenticate(self.admin)
+        response = self.client.get("/api/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        label = 'action="RecipeViewSet.list"'
+        for suffix in ("_bucket", "_sum", "_count"):
+            self.assertRegex(
+                body, rf"foodgram_request_duration_seconds{suffix}\{{{label}"
+            )
+        self.assertIn("# TYPE foodgram_db_queries histogram", body)
+        self.assertRegex(body, r"foodgram_token_cache_hits_total \d+")
+        for line in body.splitlines():
+            if line and not line.startswith("#"):
+                self.assertRegex(line, r"^[a-z_]+(\{[^}]*\})? [-+\d.eInf]+$")
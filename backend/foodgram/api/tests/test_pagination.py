@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipes.models import Follow, Recipe, User
+
+
+def create_recipes(author, count):
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=author,
+            name=f"Рецепт {i}",
+            text="Описание",
+            image="static/recipe/test.png",
+            cooking_time=10,
+        )
+        for i in range(count)
+    )
+
+
+class CursorPaginationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="reader@example.com", username="reader", password="pass"
+        )
+        authors = [
+            User.objects.create_user(
+                email=f"author{i}@example.com", username=f"author{i}", password="pass"
+            )
+            for i in range(11)
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, author=author) for author in authors
+        )
+        create_recipes(authors[0], 13)
+        # Одинаковый pub_date у всех: курсор не должен терять или повторять
+        # рецепты на границах страниц.
+        Recipe.objects.update(pub_date=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, direction):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            pages.append([item["id"] for item in response.data["results"]])
+            url = response.data[direction]
+        return pages
+
+    def check_walk(self, url, expected):
+        forward = self.walk(url, "next")
+        ids = [pk for page in forward for pk in page]
+        self.assertEqual(ids, expected)
+
+        last = self.client.get(url)
+        while last.data["next"]:
+            last = self.client.get(last.data["next"])
+        backward = self.walk(last.data["previous"], "previous")
+        self.assertEqual(backward[::-1], forward[:-1])
+
+    def test_recipes(self):
+        expected = list(
+            Recipe.objects.order_by("-pub_date", "-id").values_list("id", flat=True)
+        )
+        self.check_walk("/api/recipes/?pagination=cursor&limit=4", expected)
+
+    def test_subscriptions(self):
+        expected = list(
+            Follow.objects.filter(user=self.user)
+            .order_by("-id")
+            .values_list("author_id", flat=True)
+        )
+        self.check_walk("/api/users/subscriptions/?pagination=cursor&limit=3", expected)
+
+
+class CachedCountPaginationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="reader@example.com", username="reader", password="pass"
+        )
+        create_recipes(cls.user, settings.MAX_PAGE_SIZE + 5)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_limit_is_capped(self):
+        response = self.client.get("/api/recipes/", {"limit": 100000})
+        self.assertEqual(len(response.data["results"]), settings.MAX_PAGE_SIZE)
+        self.assertEqual(response.data["count"], settings.MAX_PAGE_SIZE + 5)
+        self.assertIs(response.data["count_exact"], True)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.data["count"], settings.MAX_PAGE_SIZE + 5)
+        return [
+            query["sql"]
+            for query in context.captured_queries
+            if "COUNT(*)" in query["sql"]
+        ]
+
+    def test_count_is_cached(self):
+        self.assertEqual(len(self.count_queries("/api/recipes/?limit=6")), 1)
+        self.assertEqual(self.count_queries("/api/recipes/?limit=6&page=2"), [])
@@ -0,0 +1,306 @@
+import base64
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+
+from recipes.models import (
+    FavoriteRecipe,
+    Follow,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+    User,
+    count_of,
+    recipe_search_vector,
+)
+
+# Точное число запросов на холодном кэше. Меньше — тоже ошибка: бюджет
+# нужно опустить, чтобы следующая регрессия не прошла незамеченной.
+BUDGETS = {
+    "recipes": 4,
+    "recipes_anonymous": 4,
+    "recipes_tags": 5,
+    "recipes_author": 5,
+    "recipes_favorited": 4,
+    "recipes_in_cart": 4,
+    "recipes_search": 4,
+    "recipes_cursor": 3,
+    "recipe_detail": 4,
+    "subscriptions": 3,
+    "download_shopping_cart": 1,
+    "ingredients_search": 1,
+    "users": 2,
+    "recipe_create": 15,
+    "recipe_update": 19,
+}
+# На PostgreSQL постраничная выдача сначала спрашивает оценку COUNT через
+# EXPLAIN, а сохранение рецепта обновляет search_vector.
+POSTGRESQL_EXTRA = {
+    "recipes": 1,
+    "recipes_anonymous": 1,
+    "recipes_tags": 1,
+    "recipes_author": 1,
+    "recipes_favorited": 1,
+    "recipes_in_cart": 1,
+    "recipes_search": 1,
+    "subscriptions": 1,
+    "users": 1,
+    "recipe_create": 1,
+    "recipe_update": 1,
+}
+USERS = 40
+RECIPES = 200
+INGREDIENTS = 500
+ITERATIONS = int(os.getenv("QUERY_BUDGET_ITERATIONS", 5))
+PERCENTILES = (50, 95, 99)
+# Перцентили задержек пишутся сюда, по файлу на СУБД, для сравнения прогонов.
+REPORT_DIRECTORY = os.getenv("QUERY_BUDGET_REPORT_DIR", tempfile.gettempdir())
+
+
+def png_data_uri():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), "orange").save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def create_all(model, objs):
+    """bulk_create, после которого у объектов есть pk на любой СУБД."""
+    model.objects.bulk_create(objs, batch_size=1000)
+    return list(model.objects.order_by("pk"))
+
+
+def percentile(values, rank):
+    values = sorted(values)
+    return values[round(rank / 100 * (len(values) - 1))]
+
+
+class QueryBudgetMixin:
+    """Бюджеты запросов эндпоинтов API на реалистичных данных.
+
+    Каждый запрос повторяется ITERATIONS раз на холодном кэше и
+    откатывается; перцентили задержек сохраняются в JSON после прогона.
+    """
+
+    budgets = BUDGETS
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        users = create_all(
+            User,
+            [
+                User(
+                    email=f"user{i}@example.com",
+                    username=f"user{i}",
+                    first_name="Имя",
+                    last_name="Фамилия",
+                )
+                for i in range(USERS)
+            ],
+        )
+        cls.tags = create_all(
+            Tag,
+            [Tag(name=f"Тег {i}", color=f"#{i:06X}", slug=f"tag{i}") for i in range(8)],
+        )
+        ingredients = create_all(
+            Ingredient,
+            [
+                Ingredient(name=f"ингредиент {i:04d}", measurement_unit="г")
+                for i in range(INGREDIENTS)
+            ],
+        )
+        recipes = create_all(
+            Recipe,
+            [
+                Recipe(
+                    author=users[i % len(users)],
+                    name=f"Рецепт {i}",
+                    text="Нарезать, смешать и запечь.",
+                    image="static/recipe/seed.png",
+                    cooking_time=rng.randint(5, 120),
+                )
+                for i in range(RECIPES)
+            ],
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe in recipes
+            for tag in rng.sample(cls.tags, rng.randint(1, 3))
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=100)
+            for recipe in recipes
+            for ingredient in rng.sample(ingredients, rng.randint(5, 30))
+        )
+        cls.user = users[0]
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, author=author) for author in users[1:21]
+        )
+        FavoriteRecipe.objects.bulk_create(
+            FavoriteRecipe(user=other, recipe=recipe)
+            for other in users
+            for recipe in rng.sample(recipes, 15)
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=other, recipe=recipe)
+            for other in users
+            for recipe in rng.sample(recipes, 7)
+        )
+        Recipe.objects.update(
+            favorites_count=count_of(FavoriteRecipe, "recipe"),
+            in_carts_count=count_of(ShoppingCart, "recipe"),
+        )
+        User.objects.update(
+            recipes_count=count_of(Recipe, "author"),
+            followers_count=count_of(Follow, "author"),
+        )
+        if connection.vendor == "postgresql":
+            Recipe.objects.update(search_vector=recipe_search_vector())
+        cls.own_recipe = Recipe.objects.filter(author=cls.user).first()
+        cls.ingredients = rng.sample(ingredients, 15)
+        cls.last_ingredient = ingredients[-1]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.results:
+            path = os.path.join(
+                REPORT_DIRECTORY, f"query_budgets_{connection.vendor}.json"
+            )
+            with open(path, "w", encoding="utf-8") as report:
+                json.dump(
+                    {"vendor": connection.vendor, "endpoints": cls.results},
+                    report,
+                    ensure_ascii=False,
+                    indent=2,
+                    sort_keys=True,
+                )
+        super().tearDownClass()
+
+    def recipe_payload(self):
+        return {
+            "ingredients": [
+                {"id": ingredient.id, "amount": 100} for ingredient in self.ingredients
+            ],
+            "tags": [tag.id for tag in self.tags[:2]],
+            "image": png_data_uri(),
+            "name": "Новый рецепт",
+            "text": "Описание",
+            "cooking_time": 30,
+        }
+
+    def check_budget(self, name, method, url, payload=None, anonymous=False):
+        client = APIClient()
+        if not anonymous:
+            client.force_authenticate(self.user)
+        timings = []
+        for _ in range(ITERATIONS):
+            cache.clear()
+            with transaction.atomic():
+                with self.assertNumQueries(self.budgets[name]):
+                    started = time.perf_counter()
+                    if payload is None:
+                        response = getattr(client, method)(url)
+                    else:
+                        response = getattr(client, method)(url, payload, format="json")
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                    timings.append(time.perf_counter() - started)
+                transaction.set_rollback(True)
+            self.assertLess(response.status_code, 400, getattr(response, "data", None))
+        self.results[name] = {
+            "method": method.upper(),
+            "url": url,
+            "queries": self.budgets[name],
+            **{
+                f"p{rank}_ms": round(percentile(timings, rank) * 1000, 2)
+                for rank in PERCENTILES
+            },
+        }
+
+    def test_recipes(self):
+        self.check_budget("recipes", "get", "/api/recipes/")
+
+    def test_recipes_anonymous(self):
+        self.check_budget("recipes_anonymous", "get", "/api/recipes/", anonymous=True)
+
+    def test_recipes_tags(self):
+        url = f"/api/recipes/?tags={self.tags[0].slug}&tags={self.tags[1].slug}"
+        self.check_budget("recipes_tags", "get", url)
+
+    def test_recipes_author(self):
+        url = f"/api/recipes/?author={self.user.id}"
+        self.check_budget("recipes_author", "get", url)
+
+    def test_recipes_favorited(self):
+        self.check_budget("recipes_favorited", "get", "/api/recipes/?is_favorited=1")
+
+    def test_recipes_in_cart(self):
+        self.check_budget(
+            "recipes_in_cart", "get", "/api/recipes/?is_in_shopping_cart=1"
+        )
+
+    def test_recipes_search(self):
+        self.check_budget("recipes_search", "get", "/api/recipes/?search=Рецепт")
+
+    def test_recipes_cursor(self):
+        self.check_budget("recipes_cursor", "get", "/api/recipes/?pagination=cursor")
+
+    def test_recipe_detail(self):
+        self.check_budget("recipe_detail", "get", f"/api/recipes/{self.own_recipe.id}/")
+
+    def test_subscriptions(self):
+        self.check_budget(
+            "subscriptions", "get", "/api/users/subscriptions/?recipes_limit=3"
+        )
+
+    def test_download_shopping_cart(self):
+        self.check_budget(
+            "download_shopping_cart", "get", "/api/recipes/download_shopping_cart/"
+        )
+
+    def test_ingredients_search(self):
+        self.check_budget("ingredients_search", "get", "/api/ingredients/?name=ингр")
+
+    def test_users(self):
+        self.check_budget("users", "get", "/api/users/")
+
+    def test_recipe_create(self):
+        payload = self.recipe_payload()
+        self.check_budget("recipe_create", "post", "/api/recipes/", payload)
+
+    def test_recipe_update(self):
+        payload = self.recipe_payload()
+        payload["ingredients"] = payload["ingredients"][5:] + [
+            {"id": self.last_ingredient.id, "amount": 1}
+        ]
+        self.check_budget(
+            "recipe_update", "patch", f"/api/recipes/{self.own_recipe.id}/", payload
+        )
+
+
+@skipUnless(connection.vendor == "sqlite", "Бюджеты для SQLite")
+class SQLiteQueryBudgetTest(QueryBudgetMixin, APITestCase):
+    pass
+
+
+@skipUnless(connection.vendor == "postgresql", "Нужен PostgreSQL")
+class PostgreSQLQueryBudgetTest(QueryBudgetMixin, APITestCase):
+    budgets = {
+        name: budget + POSTGRESQL_EXTRA.get(name, 0) for name, budget in BUDGETS.items()
+    }
@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+    User,
+)
+
+
+class RecipeListQueriesTest(APITestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="reader@example.com", username="reader", password="pass"
+        )
+        authors = [
+            User.objects.create_user(
+                email=f"author{i}@example.com", username=f"author{i}", password="pass"
+            )
+            for i in range(5)
+        ]
+        tags = [
+            Tag.objects.create(name=f"Тег {i}", color=f"#00000{i}", slug=f"tag{i}")
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f"ингредиент {i}", measurement_unit="г")
+            for i in range(10)
+        ]
+        for i in range(60):
+            recipe = Recipe.objects.create(
+                author=authors[i % len(authors)],
+                name=f"Рецепт {i}",
+                text="Описание",
+                image="recipes/images/test.png",
+                cooking_time=10,
+            )
+            recipe.tags.set(tags[: i % 3 + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=5)
+                for ingredient in ingredients[: i % 7 + 3]
+            )
+            if i % 2:
+                FavoriteRecipe.objects.create(user=cls.user, recipe=recipe)
+            if i % 3:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        # COUNT, страница с флагами пользователя, теги, ингредиенты;
+        # на PostgreSQL ещё EXPLAIN для оценки числа строк.
+        expected = 5 if connection.vendor == "postgresql" else 4
+        cache.clear()
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        small = self.count_queries("/api/recipes/?limit=6")
+        large = self.count_queries("/api/recipes/?limit=50")
+        self.assertEqual(len(small.data["results"]), 6)
+        self.assertEqual(len(large.data["results"]), 50)
+
+    def test_user_flags_come_from_annotations(self):
+        response = self.count_queries("/api/recipes/?limit=50")
+        favorites = set(
+            FavoriteRecipe.objects.filter(user=self.user).values_list(
+                "recipe_id", flat=True
+            )
+        )
+        for item in response.data["results"]:
+            self.assertEqual(item["is_favorited"], item["id"] in favorites)
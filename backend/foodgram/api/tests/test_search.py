@@ -0,0 +1,20 @@
+from django.test import TestCase
+
+from api.search import ingredient_index
+from recipes.models import Ingredient
+
+
+class IngredientIndexTest(TestCase):
+    def test_version_changes_only_after_commit(self):
+        version = ingredient_index.get_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Ingredient.objects.create(name="абрикос", measurement_unit="г")
+            self.assertEqual(ingredient_index.get_version(), version)
+        self.assertTrue(callbacks)
+        self.assertNotEqual(ingredient_index.get_version(), version)
+
+    def test_search_sees_committed_ingredient(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name="абрикос", measurement_unit="г")
+        names = [item["name"] for item in ingredient_index.search("абр")]
+        self.assertEqual(names, ["абрикос"])
@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart, User
+
+URL = "/api/recipes/download_shopping_cart/"
+
+
+class ShoppingListTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="buyer@example.com", username="buyer", password="pass"
+        )
+        grams = Ingredient.objects.create(name="сахар", measurement_unit="г")
+        spoons = Ingredient.objects.create(name="сахар", measurement_unit="ст. л.")
+        flour = Ingredient.objects.create(name="мука", measurement_unit="г")
+        amounts = ((grams, 100), (spoons, 2), (flour, 200))
+        for i in range(2):
+            recipe = Recipe.objects.create(
+                author=cls.user,
+                name=f"Рецепт {i}",
+                text="Описание",
+                image="static/recipe/test.png",
+                cooking_time=10,
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+                for ingredient, amount in amounts
+            )
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        # Одно название в двух единицах — две строки, а не одна сумма.
+        cls.expected = [
+            ["мука", "г", 400],
+            ["сахар", "г", 200],
+            ["сахар", "ст. л.", 4],
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def download(self, **params):
+        response = self.client.get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode(), response
+
+    def test_txt(self):
+        content, response = self.download()
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertEqual(
+            content.splitlines(),
+            [f"{name} ({unit}) - {amount}" for name, unit, amount in self.expected],
+        )
+
+    def test_csv(self):
+        content, response = self.download(file_format="csv")
+        self.assertTrue(response["Content-Type"].startswith("text/csv"))
+        self.assertIn("shopping_list.csv", response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], ["name", "measurement_unit", "amount"])
+        self.assertEqual(
+            rows[1:],
+            [[name, unit, str(amount)] for name, unit, amount in self.expected],
+        )
+
+    def test_json(self):
+        content, response = self.download(file_format="json")
+        self.assertTrue(response["Content-Type"].startswith("application/json"))
+        self.assertEqual(
+            json.loads(content),
+            [
+                {"name": name, "measurement_unit": unit, "amount": amount}
+                for name, unit, amount in self.expected
+            ],
+        )
+
+    def test_unknown_format(self):
+        response = self.client.get(URL, {"file_format": "xml"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("errors", response.data)
@@ -0,0 +1,45 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from api.caching import accepts_gzip
+from recipes.models import Tag
+
+
+class AcceptsGzipTest(SimpleTestCase):
+    def test_q_values(self):
+        for header, expected in (
+            ("", False),
+            ("gzip", True),
+            ("gzip, deflate, br", True),
+            ("GZIP;q=0.5", True),
+            ("gzip;q=0", False),
+            ("gzip; q=0.0, deflate", False),
+            ("deflate, *;q=0.1", True),
+            ("*;q=1, gzip;q=0", False),
+            ("gzip;q=abc", False),
+            ("x-gzip", False),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(accepts_gzip(header), expected)
+
+
+class TagSnapshotTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name="Завтрак", color="#E26C2D", slug="breakfast")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_gzip_only_when_accepted(self):
+        response = self.client.get("/api/tags/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(data[0]["slug"], "breakfast")
+        response = self.client.get("/api/tags/", HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(json.loads(response.content)[0]["slug"], "breakfast")
@@ -0,0 +1,17 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.utils import get_tag_registry
+from recipes.models import Tag
+
+
+class TagRegistryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_registry_reset_after_commit(self):
+        self.assertEqual(get_tag_registry(), {})
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = Tag.objects.create(name="Завтрак", color="#E26C2D", slug="breakfast")
+            get_tag_registry()
+        self.assertEqual(get_tag_registry(), {"breakfast": tag.id})
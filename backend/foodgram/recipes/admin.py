@@ -16,6 +16,10 @@ from import_export.admin import ImportMixin
 class IngredientsInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
+    autocomplete_fields = ("ingredient",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("recipe", "ingredient")
 
 
 class IngredientResource(resources.ModelResource):
@@ -30,19 +34,47 @@ class IngredientResource(resources.ModelResource):
 
 class IngredientAdmin(ImportMixin, admin.ModelAdmin):
     resource_class = IngredientResource
-    list_filter = ("name",)
+    list_display = ("name", "measurement_unit")
+    search_fields = ("^name",)
+    show_full_result_count = False
+
+
+class UserAdmin(admin.ModelAdmin):
+    list_display = ("email", "username", "first_name", "last_name")
+    search_fields = ("^email", "^username")
+    show_full_result_count = False
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ("pk", "name", "author", "pub_date")
+    list_display = ("pk", "name", "author", "pub_date", "favorites_count")
+    list_select_related = ("author",)
     inlines = [IngredientsInline]
-    list_filter = ("author", "name", "tags")
+    list_filter = ("tags",)
+    search_fields = ("name", "^author__email", "^author__username")
+    autocomplete_fields = ("author",)
+    show_full_result_count = False
+
+
+class UserRecipeAdmin(admin.ModelAdmin):
+    list_display = ("user", "recipe")
+    list_select_related = ("user", "recipe")
+    search_fields = ("^user__email", "^user__username", "recipe__name")
+    autocomplete_fields = ("user", "recipe")
+    show_full_result_count = False
+
+
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ("user", "author")
+    list_select_related = ("user", "author")
+    search_fields = ("^user__email", "^author__email")
+    autocomplete_fields = ("user", "author")
+    show_full_result_count = False
 
 
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Tag)
 admin.site.register(Recipe, RecipeAdmin)
-admin.site.register(ShoppingCart)
-admin.site.register(FavoriteRecipe)
-admin.site.register(Follow)
-admin.site.register(User)
+admin.site.register(ShoppingCart, UserRecipeAdmin)
+admin.site.register(FavoriteRecipe, UserRecipeAdmin)
+admin.site.register(Follow, FollowAdmin)
+admin.site.register(User, UserAdmin)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipes.models import Recipe, recipe_search_vector
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает поисковые векторы рецептов пачками."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Полнотекстовый поиск доступен только на PostgreSQL")
+        batch_size = options["batch_size"]
+        ids = Recipe.objects.order_by("pk").values_list("pk", flat=True)
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(ids.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            updated += Recipe.objects.filter(pk__in=batch).update(
+                search_vector=recipe_search_vector()
+            )
+            last_id = batch[-1]
+        self.stdout.write(self.style.SUCCESS(f"Обновлено рецептов: {updated}"))
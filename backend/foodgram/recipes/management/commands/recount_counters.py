@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from recipes.models import (
+    FavoriteRecipe,
+    Follow,
+    Recipe,
+    ShoppingCart,
+    User,
+    count_of,
+)
+
+COUNTERS = (
+    (Recipe, "favorites_count", FavoriteRecipe, "recipe"),
+    (Recipe, "in_carts_count", ShoppingCart, "recipe"),
+    (User, "recipes_count", Recipe, "author"),
+    (User, "followers_count", Follow, "author"),
+)
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики и исправляет расхождения."
+
+    def handle(self, *args, **options):
+        for model, counter, source, field in COUNTERS:
+            with transaction.atomic():
+                drifted = (
+                    model.objects.annotate(actual=count_of(source, field))
+                    .exclude(**{counter: F("actual")})
+                    .values_list("pk", flat=True)
+                )
+                fixed = model.objects.filter(pk__in=list(drifted)).update(
+                    **{counter: count_of(source, field)}
+                )
+            self.stdout.write(f"{model.__name__}.{counter}: исправлено {fixed}")
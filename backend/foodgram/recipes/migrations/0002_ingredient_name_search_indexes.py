@@ -0,0 +1,62 @@
+from django.db import DatabaseError, migrations, transaction
+
+# name__istartswith и name__icontains на PostgreSQL компилируются в
+# UPPER("name"::text) LIKE UPPER(%s), поэтому индексы строятся по тому же
+# выражению: btree с text_pattern_ops для поиска по началу и GIN pg_trgm
+# для поиска по подстроке.
+#
+# Триграммный индекс необязателен: если расширения pg_trgm нет и у роли
+# нет прав на CREATE EXTENSION, он пропускается, а ?contains= работает
+# без индекса. Чтобы получить индекс, установите расширение заранее.
+PREFIX_INDEX = (
+    "CREATE INDEX IF NOT EXISTS ingredient_name_upper_prefix "
+    "ON recipes_ingredient (UPPER(name::text) text_pattern_ops);"
+)
+TRIGRAM_INDEX = (
+    "CREATE INDEX IF NOT EXISTS ingredient_name_upper_trgm "
+    "ON recipes_ingredient USING gin (UPPER(name::text) gin_trgm_ops);"
+)
+DROP_INDEXES = (
+    "DROP INDEX IF EXISTS ingredient_name_upper_trgm;",
+    "DROP INDEX IF EXISTS ingredient_name_upper_prefix;",
+)
+
+
+def trigram_available(schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone():
+            return True
+    try:
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    except DatabaseError:
+        return False
+    return True
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(PREFIX_INDEX)
+    if trigram_available(schema_editor):
+        schema_editor.execute(TRIGRAM_INDEX)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for statement in DROP_INDEXES:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,41 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+CREATE_INDEX = (
+    "CREATE INDEX IF NOT EXISTS recipe_search_vector_gin "
+    "ON recipes_recipe USING gin (search_vector);",
+    "UPDATE recipes_recipe SET search_vector = "
+    "setweight(to_tsvector('russian', COALESCE(name, '')), 'A') || "
+    "setweight(to_tsvector('russian', COALESCE(text, '')), 'B');",
+)
+DROP_INDEX = ("DROP INDEX IF EXISTS recipe_search_vector_gin;",)
+
+
+def run_on_postgresql(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_ingredient_name_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Поисковый вектор"
+            ),
+        ),
+        migrations.RunPython(
+            run_on_postgresql(CREATE_INDEX), run_on_postgresql(DROP_INDEX)
+        ),
+    ]
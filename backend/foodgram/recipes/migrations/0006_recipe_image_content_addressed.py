@@ -0,0 +1,22 @@
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_recipe_image_renditions"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                db_index=True,
+                storage=recipes.storage.ContentAddressedStorage(),
+                upload_to="static/recipe/",
+                verbose_name="Картинка",
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    User = apps.get_model("recipes", "User")
+    FavoriteRecipe = apps.get_model("recipes", "FavoriteRecipe")
+    ShoppingCart = apps.get_model("recipes", "ShoppingCart")
+    Follow = apps.get_model("recipes", "Follow")
+    Recipe.objects.update(
+        favorites_count=count_of(FavoriteRecipe, "recipe"),
+        in_carts_count=count_of(ShoppingCart, "recipe"),
+    )
+    User.objects.update(
+        recipes_count=count_of(Recipe, "author"),
+        followers_count=count_of(Follow, "author"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_recipe_image_content_addressed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="В избранном"),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="in_carts_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="В списках покупок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="followers_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Число подписчиков"
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="recipes_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Число рецептов"),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+RELATIONS = (
+    ("FavoriteRecipe", ("user", "recipe")),
+    ("ShoppingCart", ("user", "recipe")),
+    ("Follow", ("user", "author")),
+)
+
+
+def count_of(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def remove_duplicates(apps, schema_editor):
+    """Оставляет самую раннюю строку каждой пары и пересчитывает счётчики."""
+    for model_name, fields in RELATIONS:
+        model = apps.get_model("recipes", model_name)
+        keep = (
+            model.objects.order_by()
+            .values(*fields)
+            .annotate(keep=Min("pk"))
+            .values_list("keep", flat=True)
+        )
+        model.objects.exclude(pk__in=list(keep)).delete()
+    Recipe = apps.get_model("recipes", "Recipe")
+    User = apps.get_model("recipes", "User")
+    FavoriteRecipe = apps.get_model("recipes", "FavoriteRecipe")
+    ShoppingCart = apps.get_model("recipes", "ShoppingCart")
+    Follow = apps.get_model("recipes", "Follow")
+    Recipe.objects.update(
+        favorites_count=count_of(FavoriteRecipe, "recipe"),
+        in_carts_count=count_of(ShoppingCart, "recipe"),
+    )
+    User.objects.update(followers_count=count_of(Follow, "author"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_denormalized_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="favoriterecipe",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_favorite_recipe"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="follow",
+            constraint=models.UniqueConstraint(
+                fields=("user", "author"), name="unique_follow"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="shoppingcart",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_shopping_cart"
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_references(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    StoredImage = apps.get_model("recipes", "StoredImage")
+    references = (
+        Recipe.objects.exclude(image="")
+        .order_by()
+        .values_list("image")
+        .annotate(total=Count("pk"))
+    )
+    StoredImage.objects.bulk_create(
+        (StoredImage(name=name, references=total) for name, total in references),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_unique_user_relations"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredImage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=100, unique=True, verbose_name="Файл"),
+                ),
+                (
+                    "references",
+                    models.PositiveIntegerField(default=0, verbose_name="Ссылок"),
+                ),
+            ],
+            options={
+                "verbose_name": "Файл картинки",
+                "verbose_name_plural": "Файлы картинок",
+            },
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,35 @@
-from django.core import validators
-from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core import validators
+from django.db import connection, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.storage import ContentAddressedStorage
+
+SEARCH_CONFIG = "russian"
+
+
+def recipe_search_vector():
+    """Название рецепта весит больше описания."""
+    return SearchVector("name", weight="A", config=SEARCH_CONFIG) + SearchVector(
+        "text", weight="B", config=SEARCH_CONFIG
+    )
+
+
+def count_of(model, field):
+    """Подзапрос с числом строк model, ссылающихся на текущую строку через field."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
 
 
 class User(AbstractUser):
@@ -10,6 +39,8 @@ class User(AbstractUser):
     first_name = models.CharField(verbose_name="Имя", max_length=150, blank=True)
     last_name = models.CharField(verbose_name="Фамилия", max_length=150, blank=True)
     username = models.CharField(verbose_name="Ник", max_length=150, blank=True)
+    recipes_count = models.PositiveIntegerField("Число рецептов", default=0)
+    followers_count = models.PositiveIntegerField("Число подписчиков", default=0)
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]
 
@@ -40,6 +71,11 @@ class Follow(models.Model):
         ordering = ["-id"]
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"], name="unique_follow"
+            )
+        ]
 
 
 class Ingredient(models.Model):
@@ -79,7 +115,15 @@ class Recipe(models.Model):
         User, on_delete=models.CASCADE, related_name="recipes", verbose_name="Автор"
     )
     name = models.CharField("Рецепт", max_length=200)
-    image = models.ImageField("Картинка", upload_to="static/recipe/")
+    image = models.ImageField(
+        "Картинка",
+        upload_to="static/recipe/",
+        storage=ContentAddressedStorage(),
+        db_index=True,
+    )
+    image_renditions = models.JSONField(
+        "Уменьшенные копии картинки", default=dict, blank=True, editable=False
+    )
     text = models.TextField("Описание рецепта")
 
     ingredients = models.ManyToManyField(
@@ -97,12 +141,54 @@ class Recipe(models.Model):
         verbose_name="время приготовления",
     )
     pub_date = models.DateTimeField("Дата публикации", auto_now_add=True)
+    updated = models.DateTimeField("Дата изменения", auto_now=True)
+    favorites_count = models.PositiveIntegerField("В избранном", default=0)
+    in_carts_count = models.PositiveIntegerField("В списках покупок", default=0)
+    search_vector = SearchVectorField("Поисковый вектор", null=True, editable=False)
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-pub_date",)
 
+    # Имя картинки в базе на момент загрузки или последнего save(): по нему
+    # сигналы переносят ссылку StoredImage со старой картинки на новую.
+    saved_image = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        recipe = super().from_db(db, field_names, values)
+        recipe.saved_image = recipe.__dict__.get("image")
+        return recipe
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if connection.vendor == "postgresql" and (
+            update_fields is None or {"name", "text"} & set(update_fields)
+        ):
+            Recipe.objects.filter(pk=self.pk).update(
+                search_vector=recipe_search_vector()
+            )
+
+
+class StoredImage(models.Model):
+    """Файл в ContentAddressedStorage и число рецептов, которые на него ссылаются.
+
+    Строку блокируют при сохранении файла и при его удалении, поэтому
+    загрузка той же картинки не может попасть в файл, который удаляется.
+    """
+
+    name = models.CharField("Файл", max_length=100, unique=True)
+    references = models.PositiveIntegerField("Ссылок", default=0)
+
+    class Meta:
+        verbose_name = "Файл картинки"
+        verbose_name_plural = "Файлы картинок"
+
+    def __str__(self):
+        return self.name
+
 
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
@@ -125,6 +211,8 @@ class RecipeIngredient(models.Model):
 
 
 class FavoriteRecipe(models.Model):
+    counter_field = "favorites_count"
+
     user = models.ForeignKey(
         User,
         related_name="favorite_recipe",
@@ -141,12 +229,19 @@ class FavoriteRecipe(models.Model):
     class Meta:
         verbose_name = "Избранный рецепт"
         verbose_name_plural = "Избранные рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="unique_favorite_recipe"
+            )
+        ]
 
     def __str__(self):
         return f"Пользователь {self.user} добавил рецепт {self.recipe} в избранные."
 
 
 class ShoppingCart(models.Model):
+    counter_field = "in_carts_count"
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -165,6 +260,11 @@ class ShoppingCart(models.Model):
         verbose_name = "Покупка"
         verbose_name_plural = "Покупки"
         ordering = ("-id",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="unique_shopping_cart"
+            )
+        ]
 
     def __str__(self):
         return f"Пользователь {self.user.username} добавил список {self.recipe.name} в покупки."
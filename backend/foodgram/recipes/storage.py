@@ -0,0 +1,49 @@
+import hashlib
+import os
+import posixpath
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы называются по SHA-256 содержимого.
+
+    Одинаковые загрузки хранятся одним файлом; удалять файл можно, только
+    когда на него не ссылается ни один рецепт (см. api.images.release_image).
+    Сохранение блокирует строку StoredImage файла до конца транзакции,
+    а повторно использованный файл получает свежее время изменения, чтобы
+    его не удалили как недавно освободившийся.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            return super().save(name, content, max_length)
+        extension = os.path.splitext(name)[1].lower()
+        name = posixpath.join(
+            posixpath.dirname(name), f"{content_hash(content)}{extension}"
+        )
+        StoredImage = apps.get_model("recipes", "StoredImage")
+        with transaction.atomic(savepoint=False):
+            StoredImage.objects.bulk_create(
+                [StoredImage(name=name)], ignore_conflicts=True
+            )
+            StoredImage.objects.select_for_update().filter(name=name).exists()
+            if self.exists(name):
+                os.utime(self.path(name))
+                return name
+            return super().save(name, content, max_length)
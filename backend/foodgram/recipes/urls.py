@@ -1,7 +1,13 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import IngredientsViewSet, RecipeViewSet, TagsViewSet, UserViewset
+from api.views import (
+    IngredientsViewSet,
+    MetricsView,
+    RecipeViewSet,
+    TagsViewSet,
+    UserViewset,
+)
 
 app_name = "api"
 
@@ -12,6 +18,7 @@ router.register("recipes", RecipeViewSet)
 router.register("users", UserViewset, basename="users")
 
 urlpatterns = [   
+    path("metrics/", MetricsView.as_view(), name="metrics"),
     path("", include(router.urls)),
     path("", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),